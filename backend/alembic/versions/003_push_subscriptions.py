@@ -0,0 +1,97 @@
+"""Move push subscriptions into a structured push_subscriptions table
+
+Revision ID: 003_push_subscriptions
+Revises: 002_add_push_subscription
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+from urllib.parse import urlsplit
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '003_push_subscriptions'
+down_revision = '002_add_push_subscription'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    push_subscriptions = op.create_table(
+        'push_subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('endpoint', sa.Text(), nullable=False),
+        sa.Column('origin', sa.String(255), nullable=False),
+        sa.Column('p256dh', sa.String(255), nullable=False),
+        sa.Column('auth', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('device_id'),
+    )
+    op.create_index('ix_push_subscriptions_id', 'push_subscriptions', ['id'])
+    op.create_index('ix_push_subscriptions_origin', 'push_subscriptions', ['origin'])
+
+    # Copy the JSON subscriptions stored on devices; unusable ones are dropped
+    conn = op.get_bind()
+    now = datetime.utcnow()
+    rows = []
+    for device_pk, raw in conn.execute(sa.text(
+        "SELECT id, push_subscription FROM devices WHERE push_subscription IS NOT NULL"
+    )):
+        try:
+            info = json.loads(raw)
+        except ValueError:
+            continue
+        if not isinstance(info, dict):
+            continue
+        endpoint = info.get('endpoint')
+        keys = info.get('keys') or {}
+        if not endpoint or not keys.get('p256dh') or not keys.get('auth'):
+            continue
+        parts = urlsplit(endpoint)
+        rows.append({
+            'device_id': device_pk,
+            'endpoint': endpoint,
+            'origin': f"{parts.scheme}://{parts.netloc}",
+            'p256dh': keys['p256dh'],
+            'auth': keys['auth'],
+            'created_at': now,
+            'updated_at': now,
+        })
+    if rows:
+        op.bulk_insert(push_subscriptions, rows)
+
+    with op.batch_alter_table('devices') as batch_op:
+        batch_op.drop_column('push_subscription')
+
+
+def downgrade() -> None:
+    op.add_column('devices', sa.Column('push_subscription', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    devices = sa.table(
+        'devices',
+        sa.column('id', sa.Integer()),
+        sa.column('push_subscription', sa.String()),
+    )
+    for device_pk, endpoint, p256dh, auth in conn.execute(sa.text(
+        "SELECT device_id, endpoint, p256dh, auth FROM push_subscriptions"
+    )):
+        conn.execute(
+            devices.update().where(devices.c.id == device_pk).values(
+                push_subscription=json.dumps({
+                    'endpoint': endpoint,
+                    'keys': {'p256dh': p256dh, 'auth': auth},
+                })
+            )
+        )
+
+    op.drop_index('ix_push_subscriptions_origin', table_name='push_subscriptions')
+    op.drop_index('ix_push_subscriptions_id', table_name='push_subscriptions')
+    op.drop_table('push_subscriptions')
@@ -0,0 +1,28 @@
+"""Add membership_version to users
+
+Revision ID: 004_membership_version
+Revises: 003_push_subscriptions
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_membership_version'
+down_revision = '003_push_subscriptions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('membership_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('membership_version')
@@ -0,0 +1,76 @@
+"""Index the columns hot queries filter, join and sort on
+
+Revision ID: 005_hot_query_indexes
+Revises: 004_membership_version
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '005_hot_query_indexes'
+down_revision = '004_membership_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds without blocking writes on Postgres but cannot run
+    # inside a transaction; other dialects ignore the flag
+    with op.get_context().autocommit_block():
+        # A user's groups: login claims, membership checks, group listing
+        op.create_index(
+            'ix_group_members_user_id_group_id', 'group_members', ['user_id', 'group_id'],
+            postgresql_concurrently=True
+        )
+        # A user's devices, and group devices joined through group_members.user_id
+        op.create_index('ix_devices_user_id', 'devices', ['user_id'], postgresql_concurrently=True)
+
+        # Ring history per device / per initiator, newest first; these lead with
+        # the columns of the single-column indexes they replace
+        op.create_index(
+            'ix_ring_sessions_target_device_id_started_at', 'ring_sessions',
+            ['target_device_id', 'started_at', 'id'], postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_ring_sessions_initiated_by_started_at', 'ring_sessions',
+            ['initiated_by', 'started_at', 'id'], postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_ring_sessions_status_started_at', 'ring_sessions', ['status', 'started_at'],
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_ring_sessions_target_device_id', table_name='ring_sessions',
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_ring_sessions_status', table_name='ring_sessions', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_ring_sessions_status', 'ring_sessions', ['status'], postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_ring_sessions_target_device_id', 'ring_sessions', ['target_device_id'],
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_ring_sessions_status_started_at', table_name='ring_sessions',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_ring_sessions_initiated_by_started_at', table_name='ring_sessions',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_ring_sessions_target_device_id_started_at', table_name='ring_sessions',
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_devices_user_id', table_name='devices', postgresql_concurrently=True)
+        op.drop_index(
+            'ix_group_members_user_id_group_id', table_name='group_members',
+            postgresql_concurrently=True
+        )
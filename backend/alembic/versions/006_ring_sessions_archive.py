@@ -0,0 +1,47 @@
+"""Add ring_sessions_archive for sessions past the retention age
+
+Revision ID: 006_ring_sessions_archive
+Revises: 005_hot_query_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_ring_sessions_archive'
+down_revision = '005_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ring_sessions_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('initiated_by', sa.Integer(), nullable=False),
+        sa.Column('target_device_id', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('stopped_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_ring_sessions_archive_target_device_id_started_at', 'ring_sessions_archive',
+        ['target_device_id', 'started_at', 'id']
+    )
+    op.create_index(
+        'ix_ring_sessions_archive_initiated_by_started_at', 'ring_sessions_archive',
+        ['initiated_by', 'started_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ring_sessions_archive_initiated_by_started_at', table_name='ring_sessions_archive')
+    op.drop_index('ix_ring_sessions_archive_target_device_id_started_at', table_name='ring_sessions_archive')
+    op.drop_table('ring_sessions_archive')
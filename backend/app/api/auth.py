@@ -1,40 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
+from app.models.group import GroupMember
 from app.schemas.user import UserRegister, UserLogin, TokenResponse, UserResponse
-from app.utils.security import verify_password, get_password_hash, create_access_token
+from app.utils.security import create_access_token
+from app.services.password_hasher import PasswordHasherBusy, password_hasher
+from app.services.identity import membership_claims
 from app.config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
+def _hasher_busy(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please try again shortly",
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
+
 @router.post("/register", response_model=TokenResponse)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy as e:
+        raise _hasher_busy(e)
+
     # Create new user
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
-    # Create token
+    # Create token (a new user has no groups yet)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data={"sub": str(user.id), **membership_claims([], user.membership_version)},
         expires_delta=access_token_expires
     )
 
@@ -46,20 +62,30 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user and return JWT token."""
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+
+    try:
+        valid = user is not None and await password_hasher.verify(
+            credentials.password, user.password_hash
+        )
+    except PasswordHasherBusy as e:
+        raise _hasher_busy(e)
 
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
-    # Create token
+    # Create token, carrying the user's groups so membership checks skip the DB
+    group_ids = list(await db.scalars(
+        select(GroupMember.group_id).where(GroupMember.user_id == user.id)
+    ))
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data={"sub": str(user.id), **membership_claims(group_ids, user.membership_version)},
         expires_delta=access_token_expires
     )
 
@@ -1,18 +1,20 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.user import User
+from app.services.identity import UserSnapshot, identity_cache, with_membership_claim
 from app.utils.security import verify_token
 
 security = HTTPBearer()
 
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Dependency to get current authenticated user."""
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> UserSnapshot:
+    """Dependency to get current authenticated user.
+
+    Served from the identity cache, so handlers that only need the user's
+    id, email or name do not touch the database. The token's group claim is
+    attached when it matches the user's current membership version.
+    """
     token = credentials.credentials
     payload = verify_token(token)
 
@@ -31,7 +33,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = identity_cache.get(int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,10 +41,10 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return user
+    return with_membership_claim(user, payload)
 
 
-async def get_current_user_ws(token: str, db: Session = Depends(get_db)) -> User:
+async def get_current_user_ws(token: str) -> UserSnapshot:
     """Dependency to get current user from WebSocket token."""
     payload = verify_token(token)
 
@@ -59,11 +61,11 @@ async def get_current_user_ws(token: str, db: Session = Depends(get_db)) -> User
             detail="Invalid token"
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = identity_cache.get(int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
-    return user
+    return with_membership_claim(user, payload)
@@ -7,14 +7,31 @@ from app.models.device import Device
 from app.models.group import GroupMember
 from app.schemas.device import DeviceRegister, DeviceResponse
 from app.api.deps import get_current_user
+from app.services.identity import UserSnapshot, identity_cache
+from app.services.presence import presence_tracker
 
 router = APIRouter(prefix="/api/devices", tags=["devices"])
 
 
+def _device_response(device: Device, user_name: str | None) -> DeviceResponse:
+    """Build a device response, preferring live presence over the stored row."""
+    presence = presence_tracker.get(device.device_id)
+    return DeviceResponse(
+        id=device.id,
+        user_id=device.user_id,
+        device_id=device.device_id,
+        device_name=device.device_name,
+        device_type=device.device_type,
+        user_name=user_name,
+        is_online=presence.is_online if presence else device.is_online,
+        last_seen=presence.last_seen if presence else device.last_seen
+    )
+
+
 @router.post("/register", response_model=DeviceResponse)
 def register_device(
     device_data: DeviceRegister,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Register a device for current user."""
@@ -30,7 +47,7 @@ def register_device(
         existing_device.is_online = False
         db.commit()
         db.refresh(existing_device)
-        return DeviceResponse.from_orm(existing_device)
+        return _device_response(existing_device, None)
 
     # Create new device
     device = Device(
@@ -44,53 +61,28 @@ def register_device(
     db.commit()
     db.refresh(device)
 
-    return DeviceResponse(
-        id=device.id,
-        user_id=device.user_id,
-        device_id=device.device_id,
-        device_name=device.device_name,
-        device_type=device.device_type,
-        user_name=current_user.full_name,
-        is_online=device.is_online,
-        last_seen=device.last_seen
-    )
+    return _device_response(device, current_user.full_name)
 
 
 @router.get("/", response_model=list[DeviceResponse])
 def get_devices(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all devices for current user."""
     devices = db.query(Device).filter(Device.user_id == current_user.id).all()
-    return [
-        DeviceResponse(
-            id=d.id,
-            user_id=d.user_id,
-            device_id=d.device_id,
-            device_name=d.device_name,
-            device_type=d.device_type,
-            user_name=current_user.full_name,
-            is_online=d.is_online,
-            last_seen=d.last_seen
-        )
-        for d in devices
-    ]
+    return [_device_response(d, current_user.full_name) for d in devices]
 
 
 @router.get("/group/{group_id}", response_model=list[DeviceResponse])
 def get_group_devices(
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all devices in a group."""
     # Check if user is member of group
-    membership = db.query(GroupMember).filter(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == current_user.id
-    ).first()
-    if not membership:
+    if not identity_cache.is_group_member(current_user, group_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this group"
@@ -107,25 +99,13 @@ def get_group_devices(
         GroupMember.group_id == group_id
     ).all()
 
-    return [
-        DeviceResponse(
-            id=d.id,
-            user_id=d.user_id,
-            device_id=d.device_id,
-            device_name=d.device_name,
-            device_type=d.device_type,
-            user_name=full_name,
-            is_online=d.is_online,
-            last_seen=d.last_seen
-        )
-        for d, full_name in results
-    ]
+    return [_device_response(d, full_name) for d, full_name in results]
 
 
 @router.delete("/{device_id}")
 def delete_device(
     device_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a device."""
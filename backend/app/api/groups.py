@@ -1,19 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 import secrets
 from app.database import get_db
-from app.models.user import User
 from app.models.group import Group, GroupMember
 from app.schemas.group import GroupCreate, GroupJoin, GroupResponse, MemberResponse
 from app.api.deps import get_current_user
+from app.services.identity import (
+    UserSnapshot, bump_membership_version, identity_cache, membership_changed
+)
 
 router = APIRouter(prefix="/api/groups", tags=["groups"])
 
+# Load a group's members and their users in one extra query instead of lazily per member
+_with_members = selectinload(Group.members).joinedload(GroupMember.user)
+
+
+def _group_response(group: Group) -> GroupResponse:
+    """Build a GroupResponse from a group loaded with _with_members."""
+    return GroupResponse(
+        id=group.id,
+        name=group.name,
+        invite_code=group.invite_code,
+        owner_id=group.owner_id,
+        members=[
+            MemberResponse(
+                id=gm.user.id,
+                email=gm.user.email,
+                full_name=gm.user.full_name,
+                role=gm.role
+            )
+            for gm in group.members
+        ]
+    )
+
 
 @router.post("/create", response_model=GroupResponse)
 def create_group(
     group_data: GroupCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new group."""
@@ -36,7 +60,9 @@ def create_group(
         role="owner"
     )
     db.add(member)
+    bump_membership_version(db, current_user.id)
     db.commit()
+    membership_changed(current_user.id)
     db.refresh(group)
 
     return GroupResponse(
@@ -58,7 +84,7 @@ def create_group(
 @router.post("/join", response_model=GroupResponse)
 def join_group(
     data: GroupJoin,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Join a group using invite code."""
@@ -88,107 +114,68 @@ def join_group(
         role="member"
     )
     db.add(member)
+    bump_membership_version(db, current_user.id)
+    group_id = group.id
     db.commit()
-    db.refresh(group)
+    membership_changed(current_user.id)
 
-    # Return group with all members
-    members = []
-    for gm in group.members:
-        members.append(MemberResponse(
-            id=gm.user.id,
-            email=gm.user.email,
-            full_name=gm.user.full_name,
-            role=gm.role
-        ))
-
-    return GroupResponse(
-        id=group.id,
-        name=group.name,
-        invite_code=group.invite_code,
-        owner_id=group.owner_id,
-        members=members
-    )
+    # Return group with all members (reading group.id now would reload the expired group)
+    group = db.query(Group).options(_with_members).filter(Group.id == group_id).one()
+    return _group_response(group)
 
 
 @router.get("/", response_model=list[GroupResponse])
 def get_groups(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all groups for current user."""
-    # Get groups where user is a member
-    memberships = db.query(GroupMember).filter(GroupMember.user_id == current_user.id).all()
-
-    groups = []
-    for membership in memberships:
-        group = membership.group
-        members = []
-        for gm in group.members:
-            members.append(MemberResponse(
-                id=gm.user.id,
-                email=gm.user.email,
-                full_name=gm.user.full_name,
-                role=gm.role
-            ))
-
-        groups.append(GroupResponse(
-            id=group.id,
-            name=group.name,
-            invite_code=group.invite_code,
-            owner_id=group.owner_id,
-            members=members
-        ))
+    # Get groups where user is a member, with all members in one more query
+    groups = db.query(Group).join(
+        GroupMember, GroupMember.group_id == Group.id
+    ).filter(
+        GroupMember.user_id == current_user.id
+    ).order_by(
+        GroupMember.id
+    ).options(_with_members).all()
 
-    return groups
+    return [_group_response(group) for group in groups]
 
 
 @router.get("/{group_id}", response_model=GroupResponse)
 def get_group(
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific group."""
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
-
-    # Check if user is member
-    membership = db.query(GroupMember).filter(
-        GroupMember.group_id == group.id,
-        GroupMember.user_id == current_user.id
-    ).first()
-    if not membership:
+    # Check if user is member (answered without the database when possible)
+    if not identity_cache.is_group_member(current_user, group_id):
+        exists = db.query(Group.id).filter(Group.id == group_id).first()
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Group not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of this group"
         )
 
-    members = []
-    for gm in group.members:
-        members.append(MemberResponse(
-            id=gm.user.id,
-            email=gm.user.email,
-            full_name=gm.user.full_name,
-            role=gm.role
-        ))
+    group = db.query(Group).options(_with_members).filter(Group.id == group_id).first()
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
 
-    return GroupResponse(
-        id=group.id,
-        name=group.name,
-        invite_code=group.invite_code,
-        owner_id=group.owner_id,
-        members=members
-    )
+    return _group_response(group)
 
 
 @router.post("/{group_id}/leave")
 def leave_group(
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Leave a group."""
@@ -218,6 +205,8 @@ def leave_group(
         )
 
     db.delete(membership)
+    bump_membership_version(db, current_user.id)
     db.commit()
+    membership_changed(current_user.id)
 
     return {"message": "Left group successfully"}
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import get_async_db
 from app.api.deps import get_current_user
-from app.models.user import User
+from app.services.identity import UserSnapshot
 from app.models.device import Device
+from app.models.push_subscription import PushSubscription
+from app.services.push_subscriptions import parse_subscription_info, subscription_cache
 from app.config import settings
-import json
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -15,7 +17,7 @@ class SubscriptionRequest(BaseModel):
     subscription: dict
 
 @router.get("/vapid-public-key")
-def get_vapid_public_key(current_user: User = Depends(get_current_user)):
+def get_vapid_public_key(current_user: UserSnapshot = Depends(get_current_user)):
     """
     Return the VAPID public key so the frontend can subscribe to push notifications.
     """
@@ -27,23 +29,36 @@ def get_vapid_public_key(current_user: User = Depends(get_current_user)):
     return {"publicKey": settings.VAPID_PUBLIC_KEY}
 
 @router.post("/subscribe")
-def subscribe(
+async def subscribe(
     request: SubscriptionRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """
     Save the push subscription for a specific device.
     """
-    device = db.query(Device).filter(Device.device_id == request.device_id).first()
+    device = await db.scalar(select(Device).where(Device.device_id == request.device_id))
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
     if device.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to modify this device")
 
-    # Store subscription as JSON string
-    device.push_subscription = json.dumps(request.subscription)
-    db.commit()
+    fields = parse_subscription_info(request.subscription)
+    if fields is None:
+        raise HTTPException(status_code=400, detail="Subscription needs an endpoint and p256dh/auth keys")
+
+    # One subscription per device; re-subscribing replaces it
+    subscription = await db.scalar(
+        select(PushSubscription).where(PushSubscription.device_id == device.id)
+    )
+    if subscription is None:
+        subscription = PushSubscription(device_id=device.id)
+        db.add(subscription)
+    for key, value in fields.items():
+        setattr(subscription, key, value)
+    await db.commit()
+    # Other workers may have cached this device as having no subscription
+    await subscription_cache.invalidate_everywhere([device.id])
     
     return {"status": "success", "message": "Subscription saved"}
@@ -1,39 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db, get_db
 from app.models.device import Device
 from app.models.group import GroupMember
 from app.models.ring_session import RingSession
-from app.schemas.ring import RingInitiate, RingResponse
+from app.schemas.ring import (
+    RingInitiate, RingResponse, RingGroupInitiate, RingGroupResponse, RingDeliveryOutcome,
+    RingHistoryEntry, RingHistoryResponse
+)
+from app.config import settings
 from app.api.deps import get_current_user
-from app.services.ring_service import start_ring_session, stop_ring_session, get_ring_session
+from app.services.identity import UserSnapshot, identity_cache
+from app.services.ring_service import (
+    start_ring_session, start_group_ring, stop_ring_session, get_ring_session, load_ring_session,
+    ring_history
+)
 
 router = APIRouter(prefix="/api/rings", tags=["rings"])
 
 
+def _encode_cursor(started_at: datetime, ring_session_id: int) -> str:
+    raw = json.dumps([started_at.isoformat(), ring_session_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        started_at, ring_session_id = json.loads(raw)
+        return datetime.fromisoformat(started_at), int(ring_session_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
 @router.post("/start", response_model=RingResponse)
 async def start_ring(
     data: RingInitiate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Start ringing a device."""
 
     # Get target device
-    target_device = db.query(Device).filter(Device.id == data.target_device_id).first()
+    target_device = await db.get(Device, data.target_device_id)
     if not target_device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found"
         )
 
-    # Find a group where the current user is a member (needed for RingSession)
-    group_member = db.query(GroupMember).filter(
-        GroupMember.user_id == current_user.id
-    ).first()
+    # Groups the current user is in (one is needed for the RingSession)
+    group_ids = await identity_cache.group_ids_async(current_user)
 
-    if not group_member:
+    if not group_ids:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not in any group"
@@ -41,19 +69,23 @@ async def start_ring(
 
     # Check permissions
     is_own_device = target_device.user_id == current_user.id
-    
+    group_id = min(group_ids)
+
     if not is_own_device:
-        # Verify target device owner is also in the group
-        target_owner_membership = db.query(GroupMember).filter(
-            GroupMember.group_id == group_member.group_id,
-            GroupMember.user_id == target_device.user_id
-        ).first()
+        # Verify target device owner shares one of those groups
+        shared_group_id = await db.scalar(
+            select(GroupMember.group_id).where(
+                GroupMember.group_id.in_(group_ids),
+                GroupMember.user_id == target_device.user_id
+            ).limit(1)
+        )
 
-        if not target_owner_membership:
+        if shared_group_id is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Target device owner is not in your group"
             )
+        group_id = shared_group_id
 
     # Allow ringing offline devices (for Push Notifications)
     # if not target_device.is_online: ... (Removed)
@@ -61,8 +93,9 @@ async def start_ring(
     try:
         ring_session = await start_ring_session(
             db=db,
-            group_id=group_member.group_id,
+            group_id=group_id,
             initiated_by_user_id=current_user.id,
+            initiator_name=current_user.full_name or "Someone",
             target_device_id=data.target_device_id,
             duration_seconds=data.duration_seconds
         )
@@ -83,15 +116,60 @@ async def start_ring(
         )
 
 
+@router.post("/group/{group_id}", response_model=RingGroupResponse)
+async def ring_group(
+    group_id: int,
+    data: RingGroupInitiate,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ring every device of every member of a group."""
+
+    if not await identity_cache.is_group_member_async(current_user, group_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this group"
+        )
+
+    rung = await start_group_ring(
+        db=db,
+        group_id=group_id,
+        initiated_by_user_id=current_user.id,
+        initiator_name=current_user.full_name or "Someone",
+        duration_seconds=data.duration_seconds,
+        include_own_devices=data.include_own_devices
+    )
+
+    return RingGroupResponse(
+        group_id=group_id,
+        results=[
+            RingDeliveryOutcome(
+                ring=RingResponse(
+                    id=ring_session.id,
+                    target_device_id=ring_session.target_device_id,
+                    status=ring_session.status,
+                    duration_seconds=ring_session.duration_seconds,
+                    started_at=ring_session.started_at,
+                    stopped_at=ring_session.stopped_at
+                ),
+                device_name=device.device_name,
+                websocket=outcome["websocket"],
+                push=outcome["push"]
+            )
+            for ring_session, device, outcome in rung
+        ]
+    )
+
+
 @router.post("/{ring_session_id}/stop", response_model=RingResponse)
 async def stop_ring(
     ring_session_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Stop ringing a device."""
 
-    ring_session = get_ring_session(db, ring_session_id)
+    ring_session = await load_ring_session(db, ring_session_id)
     if not ring_session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,10 +203,48 @@ async def stop_ring(
         )
 
 
+@router.get("/history", response_model=RingHistoryResponse)
+async def get_ring_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        settings.RING_HISTORY_PAGE_SIZE, ge=1, le=settings.RING_HISTORY_MAX_PAGE_SIZE
+    ),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Rings the user started or received, newest first, including archived ones."""
+
+    before = _decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    rows = await ring_history(db, current_user.id, before, limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].started_at, rows[-1].id)
+
+    return RingHistoryResponse(
+        items=[
+            RingHistoryEntry(
+                id=row.id,
+                group_id=row.group_id,
+                initiated_by=row.initiated_by,
+                target_device_id=row.target_device_id,
+                status=row.status,
+                duration_seconds=row.duration_seconds,
+                started_at=row.started_at,
+                stopped_at=row.stopped_at
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor
+    )
+
+
 @router.get("/{ring_session_id}", response_model=RingResponse)
 def get_ring(
     ring_session_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a ring session."""
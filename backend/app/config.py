@@ -11,6 +11,14 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 24 * 60  # 24 hours
+    TOKEN_CACHE_SIZE: int = 10000  # Verified tokens kept in memory
+    IDENTITY_CACHE_SIZE: int = 10000  # User snapshots kept in memory
+    IDENTITY_CACHE_TTL_SECONDS: float = 300.0
+
+    # Password hashing (bcrypt runs in its own process pool)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Queued + running before new requests get 503
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
 
     # CORS
     CORS_ORIGINS: list = ["*"]
@@ -19,11 +27,53 @@ class Settings(BaseSettings):
     APP_NAME: str = "Buzzer"
     DEBUG: bool = False
 
+    # WebSocket delivery
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    WS_QUEUE_MAX_SIZE: int = 100  # per-connection high-water mark
+    WS_QUEUE_POLICY: str = "drop_oldest"  # drop_oldest, coalesce, disconnect
+    WS_IDLE_TIMEOUT_SECONDS: float = 90.0  # clients heartbeat every 30s
+    WS_REAPER_TICK_SECONDS: float = 1.0
+    WS_STATUS_DEBOUNCE_SECONDS: float = 2.0  # 0 broadcasts every transition immediately
+    WS_BACKPLANE: str = "none"  # none (single worker), memory, postgres
+    WS_BACKPLANE_CHANNEL: str = "buzzer_ws"
+    WS_BACKPLANE_RECONNECT_MAX_SECONDS: float = 30.0  # backoff cap when the LISTEN connection drops
+
+    # Presence (heartbeats are batched before hitting the devices table)
+    PRESENCE_FLUSH_INTERVAL_SECONDS: float = 10.0
+
+    # Ring lifecycle acks from devices (batched into ring_sessions updates)
+    RING_ACK_FLUSH_INTERVAL_SECONDS: float = 2.0
+
     # VAPID Keys (Loaded from environment variables - preferred for production)
     VAPID_PRIVATE_KEY: str = ""
     VAPID_PUBLIC_KEY: str = ""
     VAPID_CLAIMS_EMAIL: str = ""
 
+    # Web Push delivery
+    PUSH_WORKERS: int = 8
+    PUSH_QUEUE_MAX_SIZE: int = 10000
+    PUSH_SEND_TIMEOUT_SECONDS: float = 10.0
+    PUSH_MAX_CONNECTIONS_PER_ORIGIN: int = 10
+    PUSH_MAX_RETRIES: int = 3
+    PUSH_RETRY_BASE_SECONDS: float = 1.0
+    PUSH_RETRY_MAX_SECONDS: float = 30.0
+    PUSH_PRUNE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    PUSH_SUBSCRIPTION_CACHE_SIZE: int = 10000
+    PUSH_SUBSCRIPTION_CACHE_TTL_SECONDS: float = 300.0
+    PUSH_SUBSCRIPTION_CACHE_MISS_TTL_SECONDS: float = 30.0  # for devices without a subscription
+    PUSH_DELIVERY_BUDGET_SECONDS: float = 30.0
+    PUSH_BREAKER_FAILURE_THRESHOLD: int = 5
+    PUSH_BREAKER_RESET_SECONDS: float = 30.0
+    # Seconds a connected device has to ack a ring before it is also pushed (0 = always push)
+    RING_PUSH_ESCALATION_SECONDS: float = 3.0
+
+    # Ring history and retention
+    RING_HISTORY_PAGE_SIZE: int = 50
+    RING_HISTORY_MAX_PAGE_SIZE: int = 200
+    RING_RETENTION_DAYS: float = 30.0  # Older sessions move to ring_sessions_archive; 0 keeps everything
+    RING_ARCHIVE_BATCH_SIZE: int = 1000
+    RING_ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+
     class Config:
         env_file = "../.env"
         case_sensitive = True
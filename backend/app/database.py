@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.config import settings
 
@@ -16,6 +18,43 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url():
+    """DATABASE_URL rewritten for the async drivers (asyncpg, aiosqlite).
+
+    Returns the URL and any connect args the async driver needs instead of
+    URL parameters it does not understand.
+    """
+    url = make_url(settings.DATABASE_URL)
+    async_connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        # asyncpg takes ssl as a connect argument, not libpq's sslmode
+        sslmode = url.query.get("sslmode")
+        if sslmode is not None:
+            url = url.difference_update_query(["sslmode"])
+            async_connect_args["ssl"] = sslmode
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url, async_connect_args
+
+
+_url, _async_connect_args = _async_url()
+
+# Used by async endpoints and the WebSocket loop so queries never block the event loop
+async_engine = create_async_engine(
+    _url,
+    echo=settings.DEBUG,
+    pool_pre_ping=True,
+    connect_args=_async_connect_args,
+)
+
+# expire_on_commit=False: attributes of committed objects are read after the
+# commit, and an async session cannot lazily refresh them
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -26,3 +65,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session (for async def endpoints)."""
+    async with AsyncSessionLocal() as db:
+        yield db
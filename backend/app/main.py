@@ -20,10 +20,47 @@ def run_migrations():
     try:
         inspector = inspect(engine)
         columns = [c['name'] for c in inspector.get_columns('devices')]
-        if 'push_subscription' not in columns:
-            print("Migrating database: Adding push_subscription column to devices table...")
+        if 'push_subscription' in columns:
+            # Subscriptions used to be a JSON string on devices; copy any that
+            # have not been moved to push_subscriptions yet
+            from app.services.push_subscriptions import parse_subscription_info
             with engine.connect() as conn:
-                conn.execute(text("ALTER TABLE devices ADD COLUMN push_subscription VARCHAR"))
+                rows = conn.execute(text(
+                    "SELECT d.id, d.push_subscription FROM devices d "
+                    "LEFT JOIN push_subscriptions s ON s.device_id = d.id "
+                    "WHERE d.push_subscription IS NOT NULL AND s.id IS NULL"
+                )).all()
+                migrated = []
+                for device_pk, raw in rows:
+                    try:
+                        fields = parse_subscription_info(json.loads(raw))
+                    except ValueError:
+                        fields = None
+                    if fields is not None:
+                        migrated.append({"device_id": device_pk, **fields})
+                if migrated:
+                    print(f"Migrating database: Moving {len(migrated)} push subscriptions to push_subscriptions...")
+                    from app.models.push_subscription import PushSubscription
+                    from datetime import datetime
+                    now = datetime.utcnow()
+                    conn.execute(
+                        PushSubscription.__table__.insert(),
+                        [{**row, "created_at": now, "updated_at": now} for row in migrated]
+                    )
+                # Clear the legacy values in the same transaction so the copy runs
+                # once; otherwise subscriptions pruned later would come back on restart
+                conn.execute(text(
+                    "UPDATE devices SET push_subscription = NULL WHERE push_subscription IS NOT NULL"
+                ))
+                conn.commit()
+                if migrated:
+                    print("Migration successful.")
+
+        user_columns = [c['name'] for c in inspector.get_columns('users')]
+        if 'membership_version' not in user_columns:
+            print("Migrating database: Adding membership_version column to users table...")
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE users ADD COLUMN membership_version INTEGER NOT NULL DEFAULT 0"))
                 conn.commit()
             print("Migration successful.")
     except Exception as e:
@@ -50,21 +87,182 @@ app.include_router(rings.router)
 app.include_router(notifications.router)
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    from app.services.presence import presence_tracker
+    from app.services.ring_acks import ring_ack_writer
+    from app.services.push_dispatcher import push_dispatcher
+    from app.services.push_pruner import subscription_pruner
+    from app.services.password_hasher import password_hasher
+    from app.services.identity import identity_cache
+    from app.services.push_subscriptions import subscription_cache
+    from app.services.ring_archiver import ring_archiver
+    from app.services.ring_escalation import ring_escalator
+    from app.websocket.backplane import create_backplane
+    from app.websocket.manager import manager
+    from app.websocket.reaper import reaper
+    from app.websocket.status import status_debouncer
+    await presence_tracker.start()
+    await ring_ack_writer.start()
+    await status_debouncer.start()
+    await push_dispatcher.start()
+    await subscription_pruner.start()
+    password_hasher.start()
+    await ring_archiver.start()
+
+    manager.on_connection_lost = handle_device_offline
+    manager.event_handlers["push_subscription_invalidated"] = subscription_cache.invalidate_many
+    manager.event_handlers["identity_invalidated"] = identity_cache.invalidate_many
+    manager.event_handlers["ring_acked"] = ring_escalator.acknowledge_many
+    manager.event_handlers["ring_push_cancelled"] = ring_escalator.cancel_many
+    await reaper.start()
+
+    backplane = create_backplane()
+    if backplane is not None:
+        await manager.attach_backplane(backplane)
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    from app.database import async_engine
+    from app.services.presence import presence_tracker
+    from app.services.ring_acks import ring_ack_writer
+    from app.services.push_dispatcher import push_dispatcher
+    from app.services.push_pruner import subscription_pruner
+    from app.services.ring_escalation import ring_escalator
+    from app.services.password_hasher import password_hasher
+    from app.services.ring_archiver import ring_archiver
+    from app.websocket.manager import manager
+    from app.websocket.reaper import reaper
+    from app.websocket.status import status_debouncer
+    await reaper.stop()
+    await ring_archiver.stop()
+    await status_debouncer.stop()
+    await ring_escalator.stop()
+    await push_dispatcher.stop()
+    await subscription_pruner.stop()
+    password_hasher.stop()
+    await manager.detach_backplane()
+    await ring_ack_writer.stop()
+    await presence_tracker.stop()
+    await async_engine.dispose()
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Runtime delivery metrics."""
+    from app.services.push_dispatcher import push_dispatcher
+    from app.services.push_pruner import subscription_pruner
+    from app.services.push_subscriptions import subscription_cache
+    from app.services.ring_escalation import ring_escalator
+    from app.services.identity import identity_cache
+    from app.services.password_hasher import password_hasher
+    from app.services.ring_archiver import ring_archiver
+    from app.utils.security import token_cache
+    from app.websocket.manager import manager
+    from app.websocket.reaper import reaper
+    from app.websocket.status import status_debouncer
+    return {
+        "websocket": manager.get_stats(),
+        "backplane": manager.backplane.get_stats() if manager.backplane is not None else None,
+        "reaper": reaper.get_stats(),
+        "status_broadcasts": status_debouncer.get_stats(),
+        "push": push_dispatcher.get_stats(),
+        "push_pruning": subscription_pruner.get_stats(),
+        "push_subscription_cache": subscription_cache.get_stats(),
+        "token_cache": token_cache.get_stats(),
+        "identity_cache": identity_cache.get_stats(),
+        "password_hasher": password_hasher.get_stats(),
+        "push_escalation": ring_escalator.get_stats(),
+        "ring_archive": ring_archiver.get_stats(),
+    }
+
+
+async def handle_device_offline(device_id: str, websocket: WebSocket):
+    """Unregister a closed socket and tell the device's groups it went offline.
+
+    Does nothing if the socket was already superseded by a newer connection
+    for the same device, or was already handled (e.g. by the idle reaper).
+    A device that moved to another worker is only unregistered here.
+    """
+    from app.websocket.manager import manager
+    from app.websocket.reaper import reaper
+    from app.websocket.status import status_debouncer
+    from app.services.presence import presence_tracker
+    from app.services.ring_escalation import ring_escalator
+
+    group_ids = manager.device_groups.get(device_id, set())
+    if not await manager.disconnect(device_id, websocket):
+        return
+
+    reaper.forget(device_id)
+    ring_escalator.device_offline(device_id)
+    if device_id in manager.remote_devices:
+        # Superseded by a connection on another worker, which reports it online
+        return
+    presence_tracker.mark_offline(device_id)
+    await status_debouncer.submit(device_id, group_ids, False)
+
+
+async def load_handshake(user_id: int, device_id: str, payload: dict):
+    """Fetch everything a WebSocket handshake needs without blocking the event loop.
+
+    The user and their groups come from the identity cache (and the token's
+    membership claim when it is current), so only the device is queried; its
+    push subscription is loaded along with it into the subscription cache.
+    Returns None if the user does not exist, otherwise a tuple of
+    (device pk, device name, set of group ids); the device fields are None
+    if the device does not exist.
+    The session is closed before returning so sockets never pin a connection.
+    """
+    from sqlalchemy import select
+    from app.database import AsyncSessionLocal
+    from app.models.device import Device
+    from app.models.push_subscription import PushSubscription
+    from app.services.identity import identity_cache, with_membership_claim
+    from app.services.push_subscriptions import subscription_cache, to_subscription
+
+    user = await identity_cache.get_async(user_id)
+    if user is None:
+        return None
+    group_ids = await identity_cache.group_ids_async(with_membership_claim(user, payload))
+
+    generation = subscription_cache.generation()
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(Device.id, Device.device_name, PushSubscription).outerjoin(
+                PushSubscription, PushSubscription.device_id == Device.id
+            ).where(
+                Device.device_id == device_id
+            )
+        )).first()
+
+    if row is None:
+        return None, None, set(group_ids)
+
+    subscription = to_subscription(row.PushSubscription) if row.PushSubscription is not None else None
+    # Keep the push subscription of online devices decoded for rings; the
+    # generation stops this from undoing a subscribe that committed meanwhile
+    subscription_cache.put(row.id, subscription, generation)
+    return row.id, row.device_name, set(group_ids)
+
+
 @app.websocket("/ws/{device_id}")
 async def websocket_endpoint(websocket: WebSocket, device_id: str, token: str):
     """WebSocket endpoint for real-time device communication."""
     from app.utils.security import verify_token
-    from app.database import SessionLocal
-    from app.models.user import User
-    from app.models.device import Device
-    from app.models.group import GroupMember
     from app.websocket.manager import manager
+    from app.websocket.reaper import reaper
+    from app.websocket.status import status_debouncer
+    from app.services.presence import presence_tracker
+    from app.services.ring_acks import ring_ack_writer
+    from app.services.ring_escalation import ring_escalator
     from datetime import datetime
 
     # Verify token
@@ -77,87 +275,74 @@ async def websocket_endpoint(websocket: WebSocket, device_id: str, token: str):
     if not user_id:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
         return
+    user_id = int(user_id)
+
+    # Look up user, device and groups (the device in one short-lived async session)
+    handshake = await load_handshake(user_id, device_id, payload)
+    if handshake is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User not found")
+        return
+
+    device_pk, device_name, group_ids = handshake
+    if device_pk is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Device not found")
+        return
+
+    # Register connection
+    await manager.connect(websocket, device_id, user_id, group_ids)
+    reaper.touch(device_id)
+
+    # Update device online status (flushed to the database in batches)
+    presence_tracker.mark_online(device_id)
+
+    # Broadcast device online status (debounced against reconnect flapping)
+    await status_debouncer.submit(device_id, group_ids, True, device_name)
+
+    logger.info(f"Device {device_id} (user {user_id}) WebSocket connected")
 
-    # Get user from database
-    db = SessionLocal()
     try:
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User not found")
-            return
-
-        # Get or create device
-        device = db.query(Device).filter(Device.device_id == device_id).first()
-        if not device:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Device not found")
-            return
-
-        # Get user's groups
-        group_memberships = db.query(GroupMember).filter(
-            GroupMember.user_id == user.id
-        ).all()
-        group_ids = {gm.group_id for gm in group_memberships}
-
-        # Register connection
-        await manager.connect(websocket, device_id, user.id, group_ids)
-
-        # Update device online status
-        device.is_online = True
-        device.last_seen = datetime.utcnow()
-        db.commit()
-
-        # Broadcast device online status
-        await manager.broadcast_device_status(device_id, group_ids, True, device.device_name)
-
-        logger.info(f"Device {device_id} (user {user.id}) WebSocket connected")
-
-        try:
-            while True:
-                # Receive message from client
-                data = await websocket.receive_json()
-                msg_type = data.get("type")
-
-                if msg_type == "heartbeat":
-                    # Update last seen and respond with pong
-                    device.last_seen = datetime.utcnow()
-                    db.commit()
-                    await websocket.send_json({
-                        "type": "pong",
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
-
-                elif msg_type == "ring_started":
-                    # Device confirmed ringing
-                    ring_session_id = data.get("ring_session_id")
-                    logger.info(f"Device {device_id} started ringing (session {ring_session_id})")
-                    # Optionally update ring session status in DB
-
-                elif msg_type == "ring_stopped":
-                    # Device stopped ringing (either by duration or manual stop)
-                    ring_session_id = data.get("ring_session_id")
-                    logger.info(f"Device {device_id} stopped ringing (session {ring_session_id})")
-                    # Optionally update ring session status in DB
-
-                elif msg_type == "ring_completed":
-                    # Ring duration completed naturally
-                    ring_session_id = data.get("ring_session_id")
-                    logger.info(f"Device {device_id} ring completed (session {ring_session_id})")
-
-        except WebSocketDisconnect:
-            await manager.disconnect(device_id)
-            device.is_online = False
-            db.commit()
-            await manager.broadcast_device_status(device_id, group_ids, False)
-            logger.info(f"Device {device_id} WebSocket disconnected")
-
-        except Exception as e:
-            logger.error(f"WebSocket error for device {device_id}: {e}")
-            await manager.disconnect(device_id)
-            device.is_online = False
-            db.commit()
-
-    finally:
-        db.close()
+        while True:
+            # Receive message from client
+            data = await websocket.receive_json()
+            msg_type = data.get("type")
+            reaper.touch(device_id)
+
+            if msg_type == "heartbeat":
+                # Update last seen and respond with pong
+                presence_tracker.heartbeat(device_id)
+                await manager.send_to_device(device_id, {
+                    "type": "pong",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+
+            elif msg_type == "ring_started":
+                # Device confirmed ringing
+                ring_session_id = data.get("ring_session_id")
+                logger.info(f"Device {device_id} started ringing (session {ring_session_id})")
+                ring_ack_writer.record(ring_session_id, device_pk, msg_type)
+                await ring_escalator.acknowledge(ring_session_id, device_id)
+
+            elif msg_type == "ring_stopped":
+                # Device stopped ringing (either by duration or manual stop)
+                ring_session_id = data.get("ring_session_id")
+                logger.info(f"Device {device_id} stopped ringing (session {ring_session_id})")
+                ring_ack_writer.record(ring_session_id, device_pk, msg_type)
+                await ring_escalator.acknowledge(ring_session_id, device_id)
+
+            elif msg_type == "ring_completed":
+                # Ring duration completed naturally
+                ring_session_id = data.get("ring_session_id")
+                logger.info(f"Device {device_id} ring completed (session {ring_session_id})")
+                ring_ack_writer.record(ring_session_id, device_pk, msg_type)
+                await ring_escalator.acknowledge(ring_session_id, device_id)
+
+    except WebSocketDisconnect:
+        await handle_device_offline(device_id, websocket)
+        logger.info(f"Device {device_id} WebSocket disconnected")
+
+    except Exception as e:
+        logger.error(f"WebSocket error for device {device_id}: {e}")
+        await handle_device_offline(device_id, websocket)
 
 
 # Serve static frontend files
@@ -2,5 +2,7 @@ from app.models.user import User
 from app.models.group import Group, GroupMember
 from app.models.device import Device
 from app.models.ring_session import RingSession
+from app.models.ring_session_archive import RingSessionArchive
+from app.models.push_subscription import PushSubscription
 
-__all__ = ["User", "Group", "GroupMember", "Device", "RingSession"]
+__all__ = ["User", "Group", "GroupMember", "Device", "RingSession", "RingSessionArchive", "PushSubscription"]
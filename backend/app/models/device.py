@@ -8,12 +8,11 @@ class Device(Base):
     __tablename__ = "devices"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
     device_name = Column(String(255), nullable=False)
     device_id = Column(String(255), unique=True, index=True, nullable=False)  # UUID v4 from client
     device_type = Column(String(50))  # mobile, desktop, etc.
     browser_info = Column(JSON, nullable=True)  # User agent, browser version, screen size
-    push_subscription = Column(String, nullable=True)  # JSON string of subscription
     last_seen = Column(DateTime, default=datetime.utcnow, nullable=True)
     is_online = Column(Boolean, default=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -22,3 +21,4 @@ class Device(Base):
     # Relationships
     user = relationship("User", back_populates="devices")
     ring_sessions = relationship("RingSession", back_populates="target_device", cascade="all, delete-orphan")
+    push_subscription = relationship("PushSubscription", back_populates="device", uselist=False, cascade="all, delete-orphan")
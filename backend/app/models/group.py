@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -35,4 +35,6 @@ class GroupMember(Base):
 
     __table_args__ = (
         UniqueConstraint('group_id', 'user_id', name='uq_group_user_membership'),
+        # A user's groups (the unique constraint only serves lookups by group)
+        Index('ix_group_members_user_id_group_id', 'user_id', 'group_id'),
     )
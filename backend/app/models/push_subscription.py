@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+
+class PushSubscription(Base):
+    __tablename__ = "push_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), unique=True, nullable=False)
+    endpoint = Column(Text, nullable=False)
+    origin = Column(String(255), index=True, nullable=False)  # scheme://host of the push service
+    p256dh = Column(String(255), nullable=False)  # Client public key (base64url)
+    auth = Column(String(255), nullable=False)  # Client auth secret (base64url)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    device = relationship("Device", back_populates="push_subscription")
+
+    def to_info(self) -> dict:
+        """Subscription in the browser's PushSubscription.toJSON() shape."""
+        return {
+            "endpoint": self.endpoint,
+            "keys": {"p256dh": self.p256dh, "auth": self.auth},
+        }
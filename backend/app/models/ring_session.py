@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -21,3 +21,11 @@ class RingSession(Base):
     group = relationship("Group", back_populates="ring_sessions")
     initiated_by_user = relationship("User", back_populates="rings_initiated")
     target_device = relationship("Device", back_populates="ring_sessions")
+
+    __table_args__ = (
+        # Ring history per device / per initiator, newest first
+        Index('ix_ring_sessions_target_device_id_started_at', 'target_device_id', 'started_at', 'id'),
+        Index('ix_ring_sessions_initiated_by_started_at', 'initiated_by', 'started_at', 'id'),
+        # Sweeps over sessions in a given state by age
+        Index('ix_ring_sessions_status_started_at', 'status', 'started_at'),
+    )
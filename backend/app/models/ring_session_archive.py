@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class RingSessionArchive(Base):
+    """Ring sessions past the retention age, moved out of ring_sessions.
+
+    Rows keep their original ids. There are no foreign keys, so archived
+    history outlives the groups, users and devices it refers to.
+    """
+    __tablename__ = "ring_sessions_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    group_id = Column(Integer, nullable=False)
+    initiated_by = Column(Integer, nullable=False)
+    target_device_id = Column(Integer, nullable=False)
+    duration_seconds = Column(Integer, nullable=True)
+    status = Column(String(50), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    stopped_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Same history lookups as ring_sessions
+        Index('ix_ring_sessions_archive_target_device_id_started_at', 'target_device_id', 'started_at', 'id'),
+        Index('ix_ring_sessions_archive_initiated_by_started_at', 'initiated_by', 'started_at', 'id'),
+    )
@@ -19,3 +19,35 @@ class RingResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class RingGroupInitiate(BaseModel):
+    """Schema for ringing every device in a group."""
+    duration_seconds: int | None = None  # None for continuous
+    include_own_devices: bool = False
+
+
+class RingDeliveryOutcome(BaseModel):
+    """How a group ring reached one device."""
+    ring: RingResponse
+    device_name: str
+    websocket: str  # sent, relayed (to another worker) or not_connected
+    push: str  # queued, awaiting_ack, dropped, no_subscription or disabled
+
+
+class RingGroupResponse(BaseModel):
+    """Schema for a group ring response."""
+    group_id: int
+    results: list[RingDeliveryOutcome]
+
+
+class RingHistoryEntry(RingResponse):
+    """A past or ongoing ring the user started or received."""
+    group_id: int
+    initiated_by: int
+
+
+class RingHistoryResponse(BaseModel):
+    """One page of ring history, newest first."""
+    items: list[RingHistoryEntry]
+    next_cursor: str | None = None  # Pass as ?cursor= for the next page; None on the last page
@@ -0,0 +1,49 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter(ABC):
+    """Base for in-memory buffers that are flushed to the database on an interval.
+
+    Subclasses implement flush(); it runs every flush_interval seconds and once
+    more on stop() so nothing buffered is lost on shutdown.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write out anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._safe_flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"{type(self).__name__} flush failed: {e}")
+
+    @abstractmethod
+    async def flush(self):
+        """Write everything buffered since the last flush."""
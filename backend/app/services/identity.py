@@ -0,0 +1,227 @@
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+import anyio
+import threading
+import time
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.group import GroupMember
+from app.models.user import User
+from app.websocket.manager import manager
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The parts of a user that request handlers need, detached from any session."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    membership_version: int = 0
+    # Groups from the request's token claim, set only when the claim is current
+    group_ids: Optional[FrozenSet[int]] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            membership_version=user.membership_version or 0
+        )
+
+
+def membership_claims(group_ids: Iterable[int], membership_version: int) -> dict:
+    """Token claims describing a user's groups as of membership_version."""
+    return {"groups": sorted(group_ids), "mv": membership_version}
+
+
+def with_membership_claim(user: UserSnapshot, payload: dict) -> UserSnapshot:
+    """Attach the token's group claim to a snapshot if it is still current."""
+    groups = payload.get("groups")
+    if not isinstance(groups, list) or payload.get("mv") != user.membership_version:
+        return user
+    return replace(user, group_ids=frozenset(groups))
+
+
+def bump_membership_version(db: Session, user_id: int):
+    """Mark a user's group claims stale; call inside the transaction that changes membership.
+
+    Call membership_changed after the transaction commits.
+    """
+    db.query(User).filter(User.id == user_id).update(
+        {User.membership_version: User.membership_version + 1},
+        synchronize_session=False
+    )
+
+
+def membership_changed(user_id: int):
+    """Drop a user from the identity cache on every worker after a membership change.
+
+    For sync endpoints on the threadpool: the backplane publish runs on the
+    event loop, and this returns once it has been handed to the backplane.
+    """
+    anyio.from_thread.run(identity_cache.invalidate_everywhere, [user_id])
+
+
+class IdentityCache:
+    """LRU of user snapshots by user id, each kept for at most ttl seconds.
+
+    Entries are dropped as soon as the user row is updated or deleted
+    through the ORM in this process, and on every worker when a membership
+    change is published with invalidate_everywhere; the TTL bounds staleness
+    for changes made anywhere else. It also remembers each user's group ids per
+    membership version, for requests whose token claim is out of date.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size or settings.IDENTITY_CACHE_SIZE
+        self.ttl = ttl or settings.IDENTITY_CACHE_TTL_SECONDS
+        # user id -> (snapshot, expires at on the monotonic clock)
+        self._entries: "OrderedDict[int, Tuple[UserSnapshot, float]]" = OrderedDict()
+        # user id -> (membership version, group ids)
+        self._memberships: Dict[int, Tuple[int, FrozenSet[int]]] = {}
+        # Sync dependencies run on the threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.membership_loads = 0
+
+    def _cached(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return None
+
+    def _store(self, user_id: int, user: Optional[User]) -> Optional[UserSnapshot]:
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        self.put(snapshot)
+        return snapshot
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        """Snapshot for a user, loading it on a miss; None if the user does not exist."""
+        snapshot = self._cached(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+            return self._store(user_id, user)
+        finally:
+            db.close()
+
+    async def get_async(self, user_id: int) -> Optional[UserSnapshot]:
+        """Like get, loading misses through the async session for use on the event loop."""
+        snapshot = self._cached(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        async with AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.id == user_id))
+            return self._store(user_id, user)
+
+    def put(self, snapshot: UserSnapshot):
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._memberships.pop(evicted, None)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._memberships.pop(user_id, None)
+
+    def invalidate_many(self, user_ids: Iterable[int]):
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    async def invalidate_everywhere(self, user_ids: Iterable[int]):
+        """Drop users here and, over the backplane, on every other worker."""
+        user_ids = list(user_ids)
+        self.invalidate_many(user_ids)
+        await manager.publish_event("identity_invalidated", user_ids)
+
+    def group_ids(self, user: UserSnapshot) -> FrozenSet[int]:
+        """Ids of the groups a user belongs to.
+
+        Comes from the token claim when it is current, then from the ids
+        last loaded for this membership version; the database is only read
+        after the version changed.
+        """
+        group_ids = self._cached_group_ids(user)
+        if group_ids is not None:
+            return group_ids
+
+        db = SessionLocal()
+        try:
+            group_ids = frozenset(db.scalars(
+                select(GroupMember.group_id).where(GroupMember.user_id == user.id)
+            ))
+        finally:
+            db.close()
+        return self._store_group_ids(user, group_ids)
+
+    async def group_ids_async(self, user: UserSnapshot) -> FrozenSet[int]:
+        """Like group_ids, loading through the async session for use on the event loop."""
+        group_ids = self._cached_group_ids(user)
+        if group_ids is not None:
+            return group_ids
+
+        async with AsyncSessionLocal() as db:
+            group_ids = frozenset(await db.scalars(
+                select(GroupMember.group_id).where(GroupMember.user_id == user.id)
+            ))
+        return self._store_group_ids(user, group_ids)
+
+    def _cached_group_ids(self, user: UserSnapshot) -> Optional[FrozenSet[int]]:
+        if user.group_ids is not None:
+            return user.group_ids
+
+        with self._lock:
+            entry = self._memberships.get(user.id)
+        if entry is not None and entry[0] == user.membership_version:
+            return entry[1]
+        return None
+
+    def _store_group_ids(self, user: UserSnapshot, group_ids: FrozenSet[int]) -> FrozenSet[int]:
+        with self._lock:
+            self.membership_loads += 1
+            if user.id in self._entries:
+                self._memberships[user.id] = (user.membership_version, group_ids)
+        return group_ids
+
+    def is_group_member(self, user: UserSnapshot, group_id: int) -> bool:
+        return group_id in self.group_ids(user)
+
+    async def is_group_member_async(self, user: UserSnapshot, group_id: int) -> bool:
+        return group_id in await self.group_ids_async(user)
+
+    def get_stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "membership_loads": self.membership_loads,
+        }
+
+
+# Global identity cache instance
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    identity_cache.invalidate(target.id)
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import multiprocessing
+import logging
+from app.config import settings
+from app.utils.security import get_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already queued; the caller should retry later."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Password hasher saturated, retry after {retry_after}s")
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool with admission control.
+
+    bcrypt is deliberately slow and holds the GIL for part of its work, so
+    running it on the shared threadpool lets a burst of logins starve every
+    other sync endpoint. Here it gets its own worker processes, and once
+    max_pending operations are queued or running new ones are refused
+    instead of piling up.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the worker pool (also done lazily on first use)."""
+        if self._executor is None:
+            # spawn: forking a process that is running an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Password hasher saturated ({self._pending} pending), rejecting")
+            raise PasswordHasherBusy(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)
+
+        self.start()
+        self._pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password; raises PasswordHasherBusy when saturated."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Check a password against its hash; raises PasswordHasherBusy when saturated."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,101 @@
+from sqlalchemy import bindparam, update
+from typing import Dict, NamedTuple, Optional, Set
+from datetime import datetime
+import asyncio
+import logging
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device import Device
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+class DevicePresence(NamedTuple):
+    is_online: bool
+    last_seen: datetime
+
+
+class PresenceTracker(BatchWriter):
+    """Records device presence in memory and flushes it to the devices table in bulk."""
+
+    def __init__(self, flush_interval: float = None):
+        super().__init__(flush_interval or settings.PRESENCE_FLUSH_INTERVAL_SECONDS)
+
+        # device_id -> latest known presence
+        self._state: Dict[str, DevicePresence] = {}
+
+        # device_ids changed since the last flush
+        self._dirty: Set[str] = set()
+
+    def _record(self, device_id: str, is_online: bool):
+        self._state[device_id] = DevicePresence(is_online, datetime.utcnow())
+        self._dirty.add(device_id)
+
+    def mark_online(self, device_id: str):
+        """Record that a device connected."""
+        self._record(device_id, True)
+
+    def heartbeat(self, device_id: str):
+        """Record a heartbeat from a connected device."""
+        self._record(device_id, True)
+
+    def mark_offline(self, device_id: str):
+        """Record that a device disconnected."""
+        self._record(device_id, False)
+
+    def get(self, device_id: str) -> Optional[DevicePresence]:
+        """Latest presence for a device, or None if the database is authoritative."""
+        return self._state.get(device_id)
+
+    async def flush(self):
+        """Write all pending presence changes in one bulk UPDATE."""
+        if not self._dirty:
+            return
+
+        pending = {device_id: self._state[device_id] for device_id in self._dirty}
+        self._dirty.clear()
+
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except Exception:
+            # Retry on the next flush; _state already holds the newest values
+            self._dirty.update(pending)
+            raise
+
+        # Offline devices are now accurate in the database; stop tracking them
+        for device_id, presence in pending.items():
+            if not presence.is_online and self._state.get(device_id) is presence:
+                del self._state[device_id]
+
+        logger.debug(f"Flushed presence for {len(pending)} devices")
+
+    @staticmethod
+    def _write(pending: Dict[str, DevicePresence]):
+        stmt = (
+            update(Device.__table__)
+            .where(Device.__table__.c.device_id == bindparam("b_device_id"))
+            .values(
+                is_online=bindparam("b_is_online"),
+                last_seen=bindparam("b_last_seen"),
+            )
+        )
+        rows = [
+            {
+                "b_device_id": device_id,
+                "b_is_online": presence.is_online,
+                "b_last_seen": presence.last_seen,
+            }
+            for device_id, presence in pending.items()
+        ]
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+        finally:
+            db.close()
+
+
+# Global presence tracker instance
+presence_tracker = PresenceTracker()
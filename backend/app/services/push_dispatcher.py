@@ -0,0 +1,313 @@
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, NamedTuple, Optional, Set
+from datetime import datetime, timezone
+import asyncio
+import json
+import random
+import time
+import logging
+import httpx
+from app.config import settings
+from app.services.push_pruner import subscription_pruner
+from app.services.push_subscriptions import Subscription
+from app.services.webpush_client import WebPushClient
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+# Push service responses that mean the subscription is gone for good
+GONE_STATUSES = {404, 410}
+
+
+class PushJob(NamedTuple):
+    device_name: str
+    subscription: Subscription
+    payload: dict
+    enqueued_at: float
+    deadline: float  # time.monotonic() by which delivery must have finished
+    attempt: int = 0
+
+    @property
+    def origin(self) -> str:
+        return self.subscription.origin
+
+
+class DeadlineExceeded(Exception):
+    """A push ran out of its delivery budget."""
+
+
+class CircuitOpen(Exception):
+    """A push was refused because its push service's breaker is open."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class PushDispatcher:
+    """Delivers Web Push notifications off the event loop.
+
+    Ring handlers enqueue jobs and return immediately; a fixed number of
+    workers drain the queue and send through a shared WebPushClient, which
+    keeps connections to each push service open between rings.
+
+    Throttled (429), server-side (5xx) and network failures are retried with
+    jittered exponential backoff, waiting at least as long as Retry-After asks.
+    Subscriptions answered with 404/410 are handed to the subscription pruner.
+
+    Every job has a delivery budget that caps each attempt's timeout and every
+    retry. Each push service origin has its own circuit breaker; while it is
+    open, jobs for that service fail immediately so a degraded provider
+    cannot tie up the workers serving everyone else.
+    """
+
+    def __init__(self, workers: int = None, max_queue_size: int = None):
+        self.workers = workers or settings.PUSH_WORKERS
+        self.max_queue_size = max_queue_size or settings.PUSH_QUEUE_MAX_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self.client: Optional[WebPushClient] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+        # Metrics
+        self.send_latency = LatencyWindow()
+        self.queue_latency = LatencyWindow()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.gone = 0
+        self.short_circuited = 0
+        self.expired = 0
+
+    async def start(self):
+        """Start the worker pool."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        if settings.VAPID_PRIVATE_KEY and settings.VAPID_CLAIMS_EMAIL:
+            # Parse the VAPID key once rather than on every send
+            try:
+                self.client = WebPushClient(
+                    settings.VAPID_PRIVATE_KEY, settings.VAPID_CLAIMS_EMAIL
+                )
+            except Exception as e:
+                logger.error(f"Invalid VAPID private key, push notifications disabled: {e}")
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Stop the workers; jobs still queued or waiting to retry are abandoned."""
+        for task in list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._retries, return_exceptions=True)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def enqueue(self, device_name: str, subscription: Subscription, payload: dict) -> bool:
+        """Queue a push without waiting; returns False if it had to be dropped."""
+        return self._put(PushJob(
+            device_name, subscription, payload,
+            time.perf_counter(), time.monotonic() + settings.PUSH_DELIVERY_BUDGET_SECONDS
+        ))
+
+    def _put(self, job: PushJob) -> bool:
+        if self._queue is None or self.client is None:
+            logger.warning("Push dispatcher not started, dropping notification")
+            self.dropped += 1
+            return False
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(
+                f"Push queue full ({self.max_queue_size}), dropping notification "
+                f"for device {job.device_name}"
+            )
+            self.dropped += 1
+            return False
+        return True
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.queue_latency.record((time.perf_counter() - job.enqueued_at) * 1000)
+            try:
+                await self._attempt(job)
+            finally:
+                self._queue.task_done()
+
+    def _breaker(self, origin: str) -> CircuitBreaker:
+        breaker = self.breakers.get(origin)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                settings.PUSH_BREAKER_FAILURE_THRESHOLD,
+                settings.PUSH_BREAKER_RESET_SECONDS
+            )
+            self.breakers[origin] = breaker
+        return breaker
+
+    async def _attempt(self, job: PushJob):
+        remaining = job.deadline - time.monotonic()
+        if remaining <= 0:
+            self._give_up(job, DeadlineExceeded("delivery budget spent while queued"))
+            return
+
+        breaker = self._breaker(job.origin)
+        if not breaker.allow():
+            self.short_circuited += 1
+            self._give_up(job, CircuitOpen(f"circuit open for {job.origin}"))
+            return
+
+        started = time.perf_counter()
+        try:
+            timeout = min(settings.PUSH_SEND_TIMEOUT_SECONDS, remaining)
+            await asyncio.wait_for(self._send(job, timeout), timeout)
+        except Exception as e:
+            if self._is_service_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            self._handle_failure(job, e)
+        else:
+            breaker.record_success()
+            self.sent += 1
+            logger.info(f"Push notification sent to device {job.device_name}")
+        finally:
+            self.send_latency.record((time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _is_service_failure(error: Exception) -> bool:
+        """Failures that say the push service itself is unhealthy."""
+        if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+            return True
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+        return status_code is not None and status_code >= 500
+
+    def _give_up(self, job: PushJob, error: Exception):
+        self.failed += 1
+        if isinstance(error, DeadlineExceeded):
+            self.expired += 1
+        logger.warning(
+            f"Failed to send push notification to device {job.device_name} "
+            f"after {job.attempt + 1} attempts: {str(error) or type(error).__name__}"
+        )
+
+    def _handle_failure(self, job: PushJob, error: Exception):
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+
+        if status_code in GONE_STATUSES:
+            self.gone += 1
+            logger.info(
+                f"Push subscription for device {job.device_name} is gone ({status_code}), pruning"
+            )
+            subscription_pruner.record(job.subscription)
+            return
+
+        # Timeouts and connection errors are worth retrying, like throttling and 5xx
+        if status_code is None:
+            retryable = isinstance(error, (asyncio.TimeoutError, httpx.TransportError))
+        else:
+            retryable = status_code == 429 or status_code >= 500
+        if not retryable or job.attempt >= settings.PUSH_MAX_RETRIES:
+            self._give_up(job, error)
+            return
+
+        retry_after = parse_retry_after(
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        delay = self._backoff(job.attempt, retry_after)
+        if delay is None:
+            self.failed += 1
+            logger.warning(
+                f"Push service asked to wait {retry_after}s for device {job.device_name}, "
+                f"longer than PUSH_RETRY_MAX_SECONDS; giving up"
+            )
+            return
+        if time.monotonic() + delay >= job.deadline:
+            self._give_up(job, DeadlineExceeded(f"no budget left to retry after: {error}"))
+            return
+
+        self.retried += 1
+        logger.info(
+            f"Retrying push to device {job.device_name} in {delay:.1f}s "
+            f"(attempt {job.attempt + 2}): {error}"
+        )
+        task = asyncio.create_task(
+            self._retry_later(delay, job._replace(attempt=job.attempt + 1))
+        )
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Full-jitter exponential delay, never shorter than Retry-After."""
+        ceiling = min(
+            settings.PUSH_RETRY_MAX_SECONDS,
+            settings.PUSH_RETRY_BASE_SECONDS * (2 ** attempt)
+        )
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            # A ring is only useful for so long; don't wait out a long throttle
+            if retry_after > settings.PUSH_RETRY_MAX_SECONDS:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _retry_later(self, delay: float, job: PushJob):
+        await asyncio.sleep(delay)
+        self._put(job._replace(enqueued_at=time.perf_counter()))
+
+    async def _send(self, job: PushJob, timeout: float):
+        await self.client.send(
+            job.subscription.info,
+            json.dumps(job.payload).encode("utf-8"),
+            timeout=timeout
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "retry_pending": len(self._retries),
+            "gone": self.gone,
+            "expired": self.expired,
+            "short_circuited": self.short_circuited,
+            "open_circuits": sorted(
+                origin for origin, breaker in self.breakers.items()
+                if breaker.state != "closed"
+            ),
+            "client": self.client.get_stats() if self.client is not None else None,
+            "queue_latency": self.queue_latency.summary(),
+            "send_latency": self.send_latency.summary(),
+        }
+
+
+# Global push dispatcher instance
+push_dispatcher = PushDispatcher()
@@ -0,0 +1,74 @@
+from sqlalchemy import bindparam, delete
+from typing import Dict
+import asyncio
+import logging
+from app.config import settings
+from app.database import SessionLocal
+from app.models.push_subscription import PushSubscription
+from app.services.batch_writer import BatchWriter
+from app.services.push_subscriptions import Subscription, subscription_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionPruner(BatchWriter):
+    """Deletes push subscriptions the push service reported as gone, in one bulk DELETE."""
+
+    def __init__(self, flush_interval: float = None):
+        super().__init__(flush_interval or settings.PUSH_PRUNE_FLUSH_INTERVAL_SECONDS)
+
+        # subscription id -> subscription that came back 404/410
+        self._pending: Dict[int, Subscription] = {}
+        self.pruned = 0
+
+    def record(self, subscription: Subscription):
+        """Mark a subscription as dead and stop handing it out to new rings."""
+        self._pending[subscription.id] = subscription
+        subscription_cache.invalidate(subscription.device_pk)
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except Exception:
+            for subscription_id, subscription in pending.items():
+                self._pending.setdefault(subscription_id, subscription)
+            raise
+
+        await subscription_cache.invalidate_everywhere(
+            subscription.device_pk for subscription in pending.values()
+        )
+
+        self.pruned += len(pending)
+        logger.info(f"Pruned {len(pending)} dead push subscriptions")
+
+    @staticmethod
+    def _write(pending: Dict[int, Subscription]):
+        table = PushSubscription.__table__
+        stmt = (
+            delete(table)
+            .where(table.c.id == bindparam("b_id"))
+            # Leave subscriptions the device re-registered in the meantime alone
+            .where(table.c.endpoint == bindparam("b_endpoint"))
+        )
+        rows = [
+            {"b_id": subscription.id, "b_endpoint": subscription.endpoint}
+            for subscription in pending.values()
+        ]
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def get_stats(self) -> dict:
+        return {"pending": len(self._pending), "pruned": self.pruned}
+
+
+# Global subscription pruner instance
+subscription_pruner = SubscriptionPruner()
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, NamedTuple, Optional, Tuple
+import logging
+import time
+from app.config import settings
+from app.models.push_subscription import PushSubscription
+from app.services.webpush_client import endpoint_origin
+from app.websocket.manager import manager
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription(NamedTuple):
+    """Decoded push subscription, ready to hand to the push dispatcher."""
+    id: int
+    device_pk: int
+    endpoint: str
+    origin: str
+    info: dict  # {"endpoint": ..., "keys": {"p256dh": ..., "auth": ...}}
+
+
+def parse_subscription_info(info: dict) -> Optional[dict]:
+    """Column values for a browser PushSubscription JSON, or None if it is unusable."""
+    if not isinstance(info, dict):
+        return None
+    endpoint = info.get("endpoint")
+    keys = info.get("keys") or {}
+    if not endpoint or not keys.get("p256dh") or not keys.get("auth"):
+        return None
+    return {
+        "endpoint": endpoint,
+        "origin": endpoint_origin(endpoint),
+        "p256dh": keys["p256dh"],
+        "auth": keys["auth"],
+    }
+
+
+def to_subscription(record: PushSubscription) -> Subscription:
+    return Subscription(
+        record.id, record.device_id, record.endpoint, record.origin, record.to_info()
+    )
+
+
+class SubscriptionCache:
+    """LRU of decoded subscriptions by device pk, including devices that have none.
+
+    Warmed when a device connects and whenever a ring looks a device up, so
+    online and frequently rung devices are served without a query. Entries
+    expire after ttl seconds (miss_ttl for devices without a subscription),
+    which bounds staleness for changes whose invalidation never reached
+    this worker.
+
+    Invalidations bump a generation counter. Callers that load from the
+    database pass the generation they read before querying to put(), so a
+    result loaded before an invalidation cannot overwrite it.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None, miss_ttl: float = None):
+        self.max_size = max_size or settings.PUSH_SUBSCRIPTION_CACHE_SIZE
+        self.ttl = ttl or settings.PUSH_SUBSCRIPTION_CACHE_TTL_SECONDS
+        self.miss_ttl = miss_ttl or settings.PUSH_SUBSCRIPTION_CACHE_MISS_TTL_SECONDS
+        # device pk -> (subscription, expires at on the monotonic clock)
+        self._entries: "OrderedDict[int, Tuple[Optional[Subscription], float]]" = OrderedDict()
+        # device pk -> generation of its latest invalidation
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self) -> int:
+        """Current generation; read it before loading a subscription to put()."""
+        return self._generation
+
+    async def get(self, db: AsyncSession, device_pk: int) -> Optional[Subscription]:
+        """Subscription for a device, loading it on a miss."""
+        entry = self._entries.get(device_pk)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            self._entries.move_to_end(device_pk)
+            return entry[0]
+
+        self.misses += 1
+        generation = self.generation()
+        record = await db.scalar(
+            select(PushSubscription).where(PushSubscription.device_id == device_pk)
+        )
+        subscription = to_subscription(record) if record is not None else None
+        self.put(device_pk, subscription, generation)
+        return subscription
+
+    def put(self, device_pk: int, subscription: Optional[Subscription], generation: int = None):
+        """Cache a subscription loaded as of generation (None: known to be current)."""
+        if generation is not None and self._invalidated.get(device_pk, -1) >= generation:
+            return
+        ttl = self.ttl if subscription is not None else self.miss_ttl
+        self._entries[device_pk] = (subscription, time.monotonic() + ttl)
+        self._entries.move_to_end(device_pk)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, device_pk: int):
+        """Drop a device's entry on this worker."""
+        self._entries.pop(device_pk, None)
+        self._invalidated[device_pk] = self._generation
+        self._invalidated.move_to_end(device_pk)
+        self._generation += 1
+        while len(self._invalidated) > self.max_size:
+            self._invalidated.popitem(last=False)
+
+    def invalidate_many(self, device_pks: Iterable[int]):
+        for device_pk in device_pks:
+            self.invalidate(device_pk)
+
+    async def invalidate_everywhere(self, device_pks: Iterable[int]):
+        """Drop devices' entries here and, over the backplane, on every other worker."""
+        device_pks = list(device_pks)
+        self.invalidate_many(device_pks)
+        await manager.publish_event("push_subscription_invalidated", device_pks)
+
+    def get_stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global subscription cache instance
+subscription_cache = SubscriptionCache()
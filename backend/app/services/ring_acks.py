@@ -0,0 +1,111 @@
+from sqlalchemy import DateTime, bindparam, func, or_, update
+from typing import Dict, NamedTuple, Tuple
+from datetime import datetime
+import asyncio
+import logging
+from app.config import settings
+from app.database import SessionLocal
+from app.models.ring_session import RingSession
+from app.services.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+# Device ack message type -> ring session status it moves to
+ACK_STATUSES = {
+    "ring_started": "ringing",
+    "ring_stopped": "stopped",
+    "ring_completed": "completed",
+}
+
+# Later states win when several acks for one session land in the same batch
+STATUS_RANK = {"ringing": 1, "stopped": 2, "completed": 2}
+
+# Statuses a session may still move out of; finished sessions are never reopened
+OPEN_STATUSES = ("initiated", "active", "ringing")
+
+
+class RingAck(NamedTuple):
+    status: str
+    at: datetime
+
+
+class RingAckWriter(BatchWriter):
+    """Buffers ring lifecycle acks from devices and applies them in one bulk UPDATE."""
+
+    def __init__(self, flush_interval: float = None):
+        super().__init__(flush_interval or settings.RING_ACK_FLUSH_INTERVAL_SECONDS)
+
+        # (ring_session_id, target device pk) -> latest transition
+        self._pending: Dict[Tuple[int, int], RingAck] = {}
+
+    def record(self, ring_session_id, device_pk: int, ack_type: str):
+        """Record an ack from the device it was sent to; unknown types are ignored."""
+        status = ACK_STATUSES.get(ack_type)
+        if status is None:
+            return
+        try:
+            ring_session_id = int(ring_session_id)
+        except (TypeError, ValueError):
+            return
+
+        key = (ring_session_id, device_pk)
+        current = self._pending.get(key)
+        if current is None or STATUS_RANK[status] >= STATUS_RANK[current.status]:
+            self._pending[key] = RingAck(status, datetime.utcnow())
+
+    async def flush(self):
+        """Write all buffered transitions in one executemany UPDATE."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except Exception:
+            # Put the batch back without overriding newer acks
+            for key, ack in pending.items():
+                self._pending.setdefault(key, ack)
+            raise
+
+        logger.debug(f"Applied {len(pending)} ring session acks")
+
+    @staticmethod
+    def _write(pending: Dict[Tuple[int, int], RingAck]):
+        table = RingSession.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .where(table.c.target_device_id == bindparam("b_device_pk"))
+            # IN () would need an expanding parameter, which executemany rejects
+            .where(or_(*(table.c.status == status for status in OPEN_STATUSES)))
+            .values(
+                status=bindparam("b_status"),
+                stopped_at=func.coalesce(
+                    table.c.stopped_at, bindparam("b_stopped_at", type_=DateTime)
+                ),
+                completed_at=func.coalesce(
+                    table.c.completed_at, bindparam("b_completed_at", type_=DateTime)
+                ),
+            )
+        )
+        rows = [
+            {
+                "b_id": ring_session_id,
+                "b_device_pk": device_pk,
+                "b_status": ack.status,
+                "b_stopped_at": ack.at if ack.status == "stopped" else None,
+                "b_completed_at": ack.at if ack.status == "completed" else None,
+            }
+            for (ring_session_id, device_pk), ack in pending.items()
+        ]
+
+        db = SessionLocal()
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+        finally:
+            db.close()
+
+
+# Global ring ack writer instance
+ring_ack_writer = RingAckWriter()
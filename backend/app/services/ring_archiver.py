@@ -0,0 +1,140 @@
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, select
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+from app.config import settings
+from app.database import SessionLocal
+from app.models.ring_session import RingSession
+from app.models.ring_session_archive import RingSessionArchive
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from ring_sessions into the archive
+_ARCHIVED_COLUMNS = (
+    "id", "group_id", "initiated_by", "target_device_id", "duration_seconds",
+    "status", "started_at", "stopped_at", "completed_at",
+)
+
+# Postgres advisory lock key held while archiving, so only one worker moves rows at a time
+ARCHIVE_LOCK_KEY = 0x72696E67
+
+
+class RingArchiver:
+    """Moves ring sessions older than the retention age into ring_sessions_archive.
+
+    Each pass moves sessions oldest first, batch_size rows per transaction,
+    so ring_sessions stays small without long locks or one huge DELETE.
+    Every worker runs one; on Postgres a batch only runs while its
+    transaction holds an advisory lock, so passes in other workers skip
+    instead of moving the same rows.
+    """
+
+    def __init__(
+        self,
+        retention_days: float = None,
+        batch_size: int = None,
+        interval: float = None
+    ):
+        self.retention_days = (
+            settings.RING_RETENTION_DAYS if retention_days is None else retention_days
+        )
+        self.batch_size = batch_size or settings.RING_ARCHIVE_BATCH_SIZE
+        self.interval = interval or settings.RING_ARCHIVE_INTERVAL_SECONDS
+        self.archived = 0
+        self.last_run_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the archival task (does nothing when retention is disabled)."""
+        if self._task is None and self.retention_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive()
+            except Exception as e:
+                logger.error(f"Ring session archival failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def archive(self) -> int:
+        """Archive every session past the retention age; returns how many moved."""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        moved = 0
+        while True:
+            count = await asyncio.to_thread(self._archive_batch, cutoff)
+            moved += count
+            self.archived += count
+            if count < self.batch_size:
+                break
+
+        self.last_run_at = datetime.utcnow()
+        if moved:
+            logger.info(f"Archived {moved} ring sessions started before {cutoff.isoformat()}")
+        return moved
+
+    def _archive_batch(self, cutoff: datetime) -> int:
+        """Move up to batch_size of the oldest expired sessions in one transaction."""
+        table = RingSession.__table__
+        db = SessionLocal()
+        try:
+            if db.get_bind().dialect.name == "postgresql" and not db.scalar(
+                select(func.pg_try_advisory_xact_lock(ARCHIVE_LOCK_KEY))
+            ):
+                # Another worker is archiving
+                return 0
+
+            # ids follow started_at, so the oldest sessions are at the head of
+            # the primary key; read at most one batch from there and stop at
+            # the first one that is not expired, rather than filtering on
+            # started_at and walking the whole index when nothing has expired
+            rows = db.execute(
+                select(table.c.id, table.c.started_at).order_by(table.c.id).limit(self.batch_size)
+            ).all()
+            ids = []
+            for session_id, started_at in rows:
+                if started_at >= cutoff:
+                    break
+                ids.append(session_id)
+            if not ids:
+                return 0
+
+            expired = and_(table.c.id <= ids[-1], table.c.started_at < cutoff)
+            db.execute(
+                insert(RingSessionArchive.__table__).from_select(
+                    _ARCHIVED_COLUMNS + ("archived_at",),
+                    select(
+                        *(table.c[name] for name in _ARCHIVED_COLUMNS),
+                        literal(datetime.utcnow(), DateTime)
+                    ).where(expired)
+                )
+            )
+            db.execute(delete(table).where(expired))
+            db.commit()
+            return len(ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "retention_days": self.retention_days,
+            "archived": self.archived,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+
+# Global ring archiver instance
+ring_archiver = RingArchiver()
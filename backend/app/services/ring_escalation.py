@@ -0,0 +1,152 @@
+from typing import Dict, NamedTuple
+import asyncio
+import logging
+from app.config import settings
+from app.services.push_dispatcher import push_dispatcher
+from app.services.push_subscriptions import Subscription
+from app.websocket.manager import manager
+
+logger = logging.getLogger(__name__)
+
+
+class PendingPush(NamedTuple):
+    device_id: str
+    device_name: str
+    subscription: Subscription
+    payload: dict
+    task: asyncio.Task
+
+
+class RingEscalator:
+    """Sends a ring's Web Push only if the WebSocket ring goes unacknowledged.
+
+    A connected device gets ack_deadline seconds to report ring_started over
+    its socket; the push is queued only if no ack arrives by then or the
+    device disconnects first. The push is held by the worker that started
+    the ring, so acks and cancellations for rings it does not hold are
+    published over the backplane. Devices that are not connected to any
+    worker are pushed straight away.
+    """
+
+    def __init__(self, ack_deadline: float = None):
+        self.ack_deadline = (
+            settings.RING_PUSH_ESCALATION_SECONDS if ack_deadline is None else ack_deadline
+        )
+
+        # ring_session_id -> push held back waiting for the device's ack
+        self._pending: Dict[int, PendingPush] = {}
+
+        # Metrics
+        self.pushed_immediately = 0
+        self.escalated = 0
+        self.avoided = 0
+        self.cancelled = 0
+
+    def deliver(
+        self,
+        ring_session_id: int,
+        device_id: str,
+        device_name: str,
+        subscription: Subscription,
+        payload: dict
+    ) -> str:
+        """Push now, or hold the push back until the WebSocket ack deadline passes.
+
+        Returns "queued", "dropped" (push queue full) or "awaiting_ack".
+        """
+        if self.ack_deadline <= 0 or not manager.is_device_connected(device_id):
+            self.pushed_immediately += 1
+            queued = push_dispatcher.enqueue(device_name, subscription, payload)
+            return "queued" if queued else "dropped"
+
+        task = asyncio.create_task(self._escalate_after(ring_session_id))
+        self._pending[ring_session_id] = PendingPush(
+            device_id, device_name, subscription, payload, task
+        )
+        return "awaiting_ack"
+
+    async def acknowledge(self, ring_session_id, device_id: str):
+        """The device reported on the ring over its socket; its push is no longer needed."""
+        try:
+            ring_session_id = int(ring_session_id)
+        except (TypeError, ValueError):
+            return
+        if not self._acknowledge(ring_session_id, device_id):
+            # The ring may have been started on another worker
+            await manager.publish_event("ring_acked", [[ring_session_id, device_id]])
+
+    def acknowledge_many(self, acks: list):
+        """Settle pushes for acks received by other workers; [ring_session_id, device_id] pairs."""
+        for ring_session_id, device_id in acks:
+            self._acknowledge(ring_session_id, device_id)
+
+    def _acknowledge(self, ring_session_id: int, device_id: str) -> bool:
+        pending = self._pending.get(ring_session_id)
+        if pending is None or pending.device_id != device_id:
+            return False
+
+        del self._pending[ring_session_id]
+        pending.task.cancel()
+        self.avoided += 1
+        return True
+
+    async def cancel(self, ring_session_id: int):
+        """Drop a held-back push for a ring that was stopped before it was acked."""
+        if not self._cancel(ring_session_id):
+            await manager.publish_event("ring_push_cancelled", [ring_session_id])
+
+    def cancel_many(self, ring_session_ids: list):
+        """Drop held-back pushes for rings stopped on other workers."""
+        for ring_session_id in ring_session_ids:
+            self._cancel(ring_session_id)
+
+    def _cancel(self, ring_session_id: int) -> bool:
+        pending = self._pending.pop(ring_session_id, None)
+        if pending is None:
+            return False
+        pending.task.cancel()
+        self.cancelled += 1
+        return True
+
+    def device_offline(self, device_id: str):
+        """Escalate straight away for rings whose device dropped before acking."""
+        for ring_session_id, pending in list(self._pending.items()):
+            if pending.device_id == device_id:
+                pending.task.cancel()
+                self._escalate(ring_session_id)
+
+    async def _escalate_after(self, ring_session_id: int):
+        await asyncio.sleep(self.ack_deadline)
+        self._escalate(ring_session_id)
+
+    def _escalate(self, ring_session_id: int):
+        pending = self._pending.pop(ring_session_id, None)
+        if pending is None:
+            return
+
+        logger.info(
+            f"No ring ack from device {pending.device_name} for session "
+            f"{ring_session_id}, escalating to push"
+        )
+        self.escalated += 1
+        push_dispatcher.enqueue(pending.device_name, pending.subscription, pending.payload)
+
+    async def stop(self):
+        """Cancel every held-back push."""
+        pending, self._pending = self._pending, {}
+        for entry in pending.values():
+            entry.task.cancel()
+        await asyncio.gather(*(entry.task for entry in pending.values()), return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "pushed_immediately": self.pushed_immediately,
+            "escalated": self.escalated,
+            "avoided": self.avoided,
+            "cancelled": self.cancelled,
+        }
+
+
+# Global ring escalator instance
+ring_escalator = RingEscalator()
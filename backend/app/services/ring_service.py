@@ -1,30 +1,36 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, tuple_, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Tuple
 from datetime import datetime
+import asyncio
+from app.config import settings
 from app.models.ring_session import RingSession
+from app.models.ring_session_archive import RingSessionArchive
 from app.models.device import Device
 from app.models.group import GroupMember
+from app.models.push_subscription import PushSubscription
 from app.websocket.manager import manager
+from app.websocket.frames import Frame
+from app.services.push_subscriptions import Subscription, subscription_cache, to_subscription
+from app.services.ring_escalation import ring_escalator
 
 
 async def start_ring_session(
-    db: Session,
+    db: AsyncSession,
     group_id: int,
     initiated_by_user_id: int,
+    initiator_name: str,
     target_device_id: int,
     duration_seconds: int = None
 ) -> RingSession:
     """Start a ring session and send command via WebSocket."""
 
     # Get target device
-    target_device = db.query(Device).filter(Device.id == target_device_id).first()
+    target_device = await db.get(Device, target_device_id)
     if not target_device:
         raise ValueError("Device not found")
 
-    # Get initiator name
-    from app.models.user import User
-    initiator = db.query(User).filter(User.id == initiated_by_user_id).first()
-    initiator_name = initiator.full_name if initiator else "Someone"
-
     # Create ring session
     ring_session = RingSession(
         group_id=group_id,
@@ -34,64 +40,155 @@ async def start_ring_session(
         status="active"
     )
     db.add(ring_session)
-    db.commit()
-    db.refresh(ring_session)
+    await db.commit()
 
-    # 1. Send WebSocket message (for in-app UI)
-    await manager.send_to_device(
+    await deliver_ring(
+        ring_session.id,
+        target_device.id,
         target_device.device_id,
-        {
+        target_device.device_name,
+        initiator_name,
+        duration_seconds,
+        await subscription_cache.get(db, target_device.id)
+    )
+
+    return ring_session
+
+
+async def start_group_ring(
+    db: AsyncSession,
+    group_id: int,
+    initiated_by_user_id: int,
+    initiator_name: str,
+    duration_seconds: int = None,
+    include_own_devices: bool = False
+) -> List[Tuple[RingSession, Device, dict]]:
+    """Ring every device owned by a group's members.
+
+    Target devices (with their push subscriptions) come from one query and
+    their ring sessions from one multi-row INSERT ... RETURNING; delivery to
+    all devices then runs concurrently. Returns (ring session, device,
+    delivery outcome) for each device.
+    """
+    query = select(Device, PushSubscription).join(
+        GroupMember, GroupMember.user_id == Device.user_id
+    ).outerjoin(
+        PushSubscription, PushSubscription.device_id == Device.id
+    ).where(
+        GroupMember.group_id == group_id
+    )
+    if not include_own_devices:
+        query = query.where(Device.user_id != initiated_by_user_id)
+    generation = subscription_cache.generation()
+    targets = (await db.execute(query.order_by(Device.id))).all()
+    if not targets:
+        return []
+
+    ring_sessions = (await db.scalars(
+        insert(RingSession).returning(RingSession),
+        [
+            {
+                "group_id": group_id,
+                "initiated_by": initiated_by_user_id,
+                "target_device_id": device.id,
+                "duration_seconds": duration_seconds,
+                "status": "active",
+            }
+            for device, _ in targets
+        ]
+    )).all()
+    await db.commit()
+    sessions_by_device = {ring_session.target_device_id: ring_session for ring_session in ring_sessions}
+
+    subscriptions = {}
+    for device, record in targets:
+        subscriptions[device.id] = to_subscription(record) if record is not None else None
+        subscription_cache.put(device.id, subscriptions[device.id], generation)
+
+    outcomes = await asyncio.gather(*(
+        deliver_ring(
+            sessions_by_device[device.id].id,
+            device.id,
+            device.device_id,
+            device.device_name,
+            initiator_name,
+            duration_seconds,
+            subscriptions[device.id]
+        )
+        for device, _ in targets
+    ))
+
+    return [
+        (sessions_by_device[device.id], device, outcome)
+        for (device, _), outcome in zip(targets, outcomes)
+    ]
+
+
+async def deliver_ring(
+    ring_session_id: int,
+    device_pk: int,
+    device_id: str,
+    device_name: str,
+    initiator_name: str,
+    duration_seconds: Optional[int],
+    subscription: Optional[Subscription]
+) -> dict:
+    """Send a ring to one device over its socket and, if needed, Web Push.
+
+    Returns how each channel was handled, e.g.
+    {"websocket": "sent", "push": "awaiting_ack"}.
+    """
+    # 1. Send WebSocket message (for in-app UI)
+    connected_here = manager.is_device_online(device_id)
+    delivered = await manager.send_frame_to_device(
+        device_id,
+        Frame({
             "type": "ring_command",
-            "ring_session_id": ring_session.id,
+            "ring_session_id": ring_session_id,
             "duration": duration_seconds,
             "initiator_name": initiator_name
-        }
+        })
     )
+    if not delivered:
+        websocket = "not_connected"
+    else:
+        websocket = "sent" if connected_here else "relayed"
 
-    # 2. Send Web Push Notification (for background/system)
-    if target_device.push_subscription:
-        try:
-            from pywebpush import webpush, WebPushException
-            import json
-            from app.config import settings
-
-            subscription_info = json.loads(target_device.push_subscription)
-            
-            # Only send if keys are configured
-            if settings.VAPID_PRIVATE_KEY and settings.VAPID_CLAIMS_EMAIL:
-                webpush(
-                    subscription_info=subscription_info,
-                    data=json.dumps({
-                        "title": "BUZZER",
-                        "body": f"{initiator_name} is buzzing you!",
-                        "icon": "/static/images/icon-192.png",
-                        "url": "/dashboard.html"
-                    }),
-                    vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                    vapid_claims={"sub": settings.VAPID_CLAIMS_EMAIL}
-                )
-                print(f"Push notification sent to device {target_device.device_name}")
-        except Exception as e:
-            print(f"Failed to send push notification: {str(e)}")
+    # 2. Web Push Notification (for background/system), held back while a
+    #    connected device still has time to acknowledge the WebSocket ring.
+    #    Only sent if keys are configured.
+    if not (settings.VAPID_PRIVATE_KEY and settings.VAPID_CLAIMS_EMAIL):
+        push = "disabled"
+    elif subscription is None:
+        push = "no_subscription"
+    else:
+        push = ring_escalator.deliver(
+            ring_session_id,
+            device_id,
+            device_name,
+            subscription,
+            {
+                "title": "BUZZER",
+                "body": f"{initiator_name} is buzzing you!",
+                "icon": "/static/images/icon-192.png",
+                "url": "/dashboard.html"
+            }
+        )
 
-    return ring_session
+    return {"websocket": websocket, "push": push}
 
 
 async def stop_ring_session(
-    db: Session,
+    db: AsyncSession,
     ring_session_id: int
 ) -> RingSession:
     """Stop a ring session."""
 
-    ring_session = db.query(RingSession).filter(
-        RingSession.id == ring_session_id
-    ).first()
+    ring_session = await load_ring_session(db, ring_session_id)
     if not ring_session:
         raise ValueError("Ring session not found")
 
-    device = db.query(Device).filter(
-        Device.id == ring_session.target_device_id
-    ).first()
+    device = ring_session.target_device
 
     # Send stop command
     message = {
@@ -100,17 +197,70 @@ async def stop_ring_session(
         "timestamp": datetime.utcnow().isoformat()
     }
 
-    await manager.send_to_device(device.device_id, message)
+    await manager.send_frame_to_device(device.device_id, Frame(message))
+    await ring_escalator.cancel(ring_session_id)
 
     ring_session.status = "stopped"
     ring_session.stopped_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     return ring_session
 
 
+async def load_ring_session(db: AsyncSession, ring_session_id: int) -> Optional[RingSession]:
+    """Get a ring session by ID with its target device loaded."""
+    return await db.scalar(
+        select(RingSession).options(
+            joinedload(RingSession.target_device)
+        ).where(RingSession.id == ring_session_id)
+    )
+
+
 def get_ring_session(db: Session, ring_session_id: int) -> RingSession:
     """Get a ring session by ID."""
     return db.query(RingSession).filter(
         RingSession.id == ring_session_id
     ).first()
+
+
+async def ring_history(
+    db: AsyncSession,
+    user_id: int,
+    before: Optional[Tuple[datetime, int]],
+    limit: int
+) -> list:
+    """Rings a user started or whose devices were rung, newest first.
+
+    Keyset pagination: before is the (started_at, id) of the last row of the
+    previous page. Each of the user's devices and the user as initiator gets
+    its own branch, in both ring_sessions and the archive, so every branch is
+    a bounded range scan of a (..., started_at, id) index; one UNION then
+    merges them (and drops rings the user sent to their own devices twice).
+    """
+    device_ids = (await db.scalars(
+        select(Device.id).where(Device.user_id == user_id)
+    )).all()
+
+    branches = []
+    for model in (RingSession, RingSessionArchive):
+        columns = (
+            model.id, model.group_id, model.initiated_by, model.target_device_id,
+            model.duration_seconds, model.status, model.started_at, model.stopped_at
+        )
+        conditions = [model.initiated_by == user_id]
+        conditions += [model.target_device_id == device_id for device_id in device_ids]
+        for condition in conditions:
+            branch = select(*columns).where(condition)
+            if before is not None:
+                branch = branch.where(tuple_(model.started_at, model.id) < tuple_(*before))
+            branches.append(
+                select(branch.order_by(
+                    model.started_at.desc(), model.id.desc()
+                ).limit(limit).subquery())
+            )
+
+    merged = union(*branches).subquery()
+    rows = await db.execute(
+        select(merged).order_by(merged.c.started_at.desc(), merged.c.id.desc()).limit(limit)
+    )
+    return rows.all()
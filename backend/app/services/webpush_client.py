@@ -0,0 +1,122 @@
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import time
+import httpx
+from py_vapid import Vapid
+from pywebpush import WebPusher
+from app.config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # optional, fall back to HTTP/1.1 keep-alive
+    HTTP2_AVAILABLE = False
+
+# Lifetime of a signed VAPID JWT (push services reject anything over 24h)
+VAPID_TOKEN_TTL_SECONDS = 12 * 60 * 60
+
+# Re-sign this long before a cached token expires
+VAPID_TOKEN_REFRESH_MARGIN_SECONDS = 5 * 60
+
+
+def endpoint_origin(endpoint: str) -> str:
+    """scheme://host[:port] of a push endpoint; also the VAPID audience."""
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class PushServiceError(Exception):
+    """Non-success reply from a push service; carries the httpx response."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        super().__init__(f"Push failed: {response.status_code} {response.text[:200]}")
+
+
+class VapidSigner:
+    """Signs VAPID headers with a key parsed once, caching one JWT per audience."""
+
+    def __init__(self, private_key: str, subject: str):
+        self._vapid = Vapid.from_string(private_key=private_key)
+        self.subject = subject
+        # audience -> (headers, expires at)
+        self._cache: Dict[str, Tuple[Dict[str, str], int]] = {}
+
+    def headers(self, audience: str) -> Dict[str, str]:
+        now = int(time.time())
+        cached = self._cache.get(audience)
+        if cached is not None and cached[1] - VAPID_TOKEN_REFRESH_MARGIN_SECONDS > now:
+            return cached[0]
+
+        expires_at = now + VAPID_TOKEN_TTL_SECONDS
+        headers = self._vapid.sign({
+            "sub": self.subject,
+            "aud": audience,
+            "exp": expires_at,
+        })
+        self._cache[audience] = (headers, expires_at)
+        return headers
+
+
+class WebPushClient:
+    """Async Web Push sender with one keep-alive HTTP client per push service.
+
+    Payloads are encrypted with pywebpush's aes128gcm encoder; the request
+    itself goes out over a pooled httpx client (HTTP/2 when h2 is installed)
+    so consecutive pushes to the same provider reuse one TLS connection.
+    """
+
+    def __init__(self, private_key: str, subject: str):
+        self.signer = VapidSigner(private_key, subject)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _client(self, origin: str) -> httpx.AsyncClient:
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.PUSH_MAX_CONNECTIONS_PER_ORIGIN,
+                    max_keepalive_connections=settings.PUSH_MAX_CONNECTIONS_PER_ORIGIN,
+                ),
+            )
+            self._clients[origin] = client
+        return client
+
+    async def send(
+        self,
+        subscription_info: dict,
+        data: bytes,
+        ttl: int = 0,
+        timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """Encrypt and POST one message; raises PushServiceError on a non-2xx reply."""
+        endpoint = subscription_info["endpoint"]
+        origin = endpoint_origin(endpoint)
+
+        encoded = WebPusher(subscription_info).encode(data, "aes128gcm")
+        headers = {
+            **self.signer.headers(origin),
+            "Content-Encoding": "aes128gcm",
+            "TTL": str(ttl),
+        }
+
+        response = await self._client(origin).post(
+            endpoint,
+            content=encoded["body"],
+            headers=headers,
+            timeout=timeout,
+        )
+        if response.status_code > 202:
+            raise PushServiceError(response)
+        return response
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        await asyncio.gather(
+            *(client.aclose() for client in clients.values()), return_exceptions=True
+        )
+
+    def get_stats(self) -> dict:
+        return {"origins": len(self._clients), "http2": HTTP2_AVAILABLE}
@@ -0,0 +1,27 @@
+from collections import deque
+from typing import Deque
+
+
+class LatencyWindow:
+    """Rolling window of latency samples (ms) with percentile summaries."""
+
+    def __init__(self, size: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, latency_ms: float):
+        self.samples.append(latency_ms)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "count": len(samples),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1], 2),
+        }
@@ -1,6 +1,10 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
+import hashlib
+import threading
+import time
 from passlib.context import CryptContext
 from app.config import settings
 
@@ -35,12 +39,96 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class TokenCache:
+    """LRU of verified token payloads, keyed by a SHA-256 digest of the token.
+
+    Entries live until the token's own exp and are evicted oldest-first once
+    max_size is reached. Only successfully verified tokens are cached.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or settings.TOKEN_CACHE_SIZE
+        # digest -> (payload, exp as a unix timestamp)
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._decodes = 0
+        self._decode_seconds = 0.0
+        # verify_token is called from threadpool workers
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(payload)
+
+    def put(self, token: str, payload: dict, decode_seconds: float):
+        self._decodes += 1
+        self._decode_seconds += decode_seconds
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(payload), exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        average_decode = self._decode_seconds / self._decodes if self._decodes else 0.0
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            # Estimated from the average cost of the decodes we did run
+            "decode_ms_saved": round(self.hits * average_decode * 1000, 2),
+        }
+
+
+# Global verified-token cache
+token_cache = TokenCache()
+
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify a JWT token and return its payload."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    started = time.perf_counter()
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
         return None
+    token_cache.put(token, payload, time.perf_counter() - started)
+    return payload
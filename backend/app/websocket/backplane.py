@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import json
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Receives envelopes published by other workers
+DeliverCallback = Callable[[dict], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """Carries messages between ConnectionManagers running in different workers.
+
+    Envelopes are small dicts describing a target (device, user or groups) and a
+    pre-encoded frame, or a batch of device status changes. Every worker
+    receives every envelope and delivers it to whichever of the targets it
+    holds sockets for.
+    """
+
+    # Largest serialized envelope the transport accepts (None = unlimited)
+    max_payload_bytes: Optional[int] = None
+
+    @abstractmethod
+    async def start(self, deliver: DeliverCallback):
+        """Begin receiving envelopes published by other workers."""
+
+    @abstractmethod
+    async def publish(self, envelope: dict):
+        """Send an envelope to every other worker."""
+
+    async def stop(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class InProcessHub:
+    """Shared bus that connects InProcessBackplanes living in the same process."""
+
+    def __init__(self):
+        self.subscribers: List["InProcessBackplane"] = []
+
+
+class InProcessBackplane(Backplane):
+    """Backplane for tests and single-process setups with several managers."""
+
+    def __init__(self, hub: InProcessHub = None):
+        self.hub = hub or InProcessHub()
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        self.hub.subscribers.append(self)
+
+    async def publish(self, envelope: dict):
+        for subscriber in list(self.hub.subscribers):
+            if subscriber is not self and subscriber._deliver:
+                await subscriber._deliver(envelope)
+
+    async def stop(self):
+        if self in self.hub.subscribers:
+            self.hub.subscribers.remove(self)
+        self._deliver = None
+
+
+class PostgresBackplane(Backplane):
+    """Backplane over Postgres LISTEN/NOTIFY, for several workers sharing one database."""
+
+    # Postgres rejects NOTIFY payloads of 8000 bytes or more
+    MAX_PAYLOAD_BYTES = 7999
+    max_payload_bytes = MAX_PAYLOAD_BYTES
+
+    def __init__(self, dsn: str, channel: str = None, reconnect_max_seconds: float = None):
+        self.dsn = dsn
+        self.channel = channel or settings.WS_BACKPLANE_CHANNEL
+        self.reconnect_max_seconds = (
+            reconnect_max_seconds or settings.WS_BACKPLANE_RECONNECT_MAX_SECONDS
+        )
+        self._deliver: Optional[DeliverCallback] = None
+        self._listen_conn = None
+        self._listen_fd: Optional[int] = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._deliveries = set()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # stopped, listening or reconnecting (messages from other workers are missed meanwhile)
+        self.state = "stopped"
+        self.reconnects = 0
+        self.dropped_oversize = 0
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._watch(self._open_listener())
+        self._publish_conn = self._connect()
+        logger.info(f"Postgres backplane listening on channel {self.channel}")
+
+    def _connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def _open_listener(self):
+        """Open a connection that LISTENs on the channel."""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _watch(self, conn):
+        """Read notifications arriving on a listening connection from the event loop."""
+        self._listen_conn = conn
+        self._listen_fd = conn.fileno()
+        self._loop.add_reader(self._listen_fd, self._on_readable)
+        self.state = "listening"
+
+    def _close_listener(self):
+        if self._listen_fd is not None:
+            self._loop.remove_reader(self._listen_fd)
+            self._listen_fd = None
+        if self._listen_conn is not None:
+            try:
+                self._listen_conn.close()
+            except Exception:
+                pass
+            self._listen_conn = None
+
+    async def _reconnect(self):
+        """Re-open the LISTEN connection with exponential backoff until it works."""
+        attempt = 0
+        while True:
+            delay = min(self.reconnect_max_seconds, 2 ** attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+            try:
+                # psycopg2 connects synchronously; keep that off the event loop
+                conn = await asyncio.to_thread(self._open_listener)
+            except Exception as e:
+                logger.warning(f"Backplane reconnect attempt {attempt} failed: {e}")
+                continue
+            self._watch(conn)
+            self.reconnects += 1
+            logger.info(f"Backplane listening on channel {self.channel} again after {attempt} attempts")
+            # Envelopes sent while we were away are lost; let the manager resync
+            await self._deliver({"origin": None, "target": "backplane_reconnected"})
+            return
+
+    def _on_readable(self):
+        try:
+            self._listen_conn.poll()
+        except Exception as e:
+            logger.error(f"Backplane listen connection failed, reconnecting: {e}")
+            self._close_listener()
+            self.state = "reconnecting"
+            if self._reconnect_task is None or self._reconnect_task.done():
+                self._reconnect_task = asyncio.ensure_future(self._reconnect())
+            return
+
+        while self._listen_conn.notifies:
+            notify = self._listen_conn.notifies.pop(0)
+            try:
+                envelope = json.loads(notify.payload)
+            except ValueError:
+                logger.warning("Dropping malformed backplane payload")
+                continue
+            task = asyncio.ensure_future(self._deliver(envelope))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def publish(self, envelope: dict):
+        payload = json.dumps(envelope, separators=(",", ":"))
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            self.dropped_oversize += 1
+            logger.error(
+                f"Backplane payload of {len(payload)} bytes exceeds NOTIFY limit, dropping"
+            )
+            return
+
+        async with self._publish_lock:
+            await asyncio.to_thread(self._notify, payload)
+
+    def _notify(self, payload: str):
+        # A publish connection that failed is re-opened by the next publish
+        if self._publish_conn is None or self._publish_conn.closed:
+            self._publish_conn = self._connect()
+        try:
+            with self._publish_conn.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+        except Exception:
+            self._publish_conn.close()
+            raise
+
+    async def stop(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+        if self._loop is not None:
+            self._close_listener()
+        if self._publish_conn is not None:
+            self._publish_conn.close()
+            self._publish_conn = None
+        self._deliver = None
+        self.state = "stopped"
+
+    def get_stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "dropped_oversize": self.dropped_oversize,
+        }
+
+
+def create_backplane() -> Optional[Backplane]:
+    """Build the backplane selected by WS_BACKPLANE, or None for a single worker."""
+    backend = settings.WS_BACKPLANE
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InProcessBackplane()
+    if backend == "postgres":
+        from sqlalchemy.engine import make_url
+
+        url = make_url(settings.DATABASE_URL)
+        if not url.drivername.startswith("postgresql"):
+            raise ValueError("WS_BACKPLANE=postgres requires a PostgreSQL DATABASE_URL")
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBackplane(dsn)
+    raise ValueError(f"Unknown WS_BACKPLANE backend: {backend}")
@@ -0,0 +1,168 @@
+from fastapi import WebSocket
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional
+from collections import deque
+import asyncio
+import time
+import logging
+from app.config import settings
+from app.websocket.frames import Frame
+
+logger = logging.getLogger(__name__)
+
+# Backpressure policies applied once a connection's queue hits its high-water mark
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_COALESCE = "coalesce"
+POLICY_DISCONNECT = "disconnect"
+
+# Messages that are safe to drop or merge; ring/stop commands never are
+DROPPABLE_TYPES = {"device_status_changed", "device_status_batch", "pong"}
+
+
+def coalesce_key(frame: Frame) -> Optional[Hashable]:
+    """Key identifying messages where only the latest one matters."""
+    msg_type = frame.type
+    if msg_type == "device_status_changed":
+        return (msg_type, frame.message.get("device_id"))
+    if msg_type == "pong":
+        return (msg_type,)
+    return None
+
+
+class OutboundMessage:
+    """A queued frame and the time it was enqueued."""
+
+    __slots__ = ("frame", "key", "enqueued_at")
+
+    def __init__(self, frame: Frame, key: Optional[Hashable]):
+        self.frame = frame
+        self.key = key
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def droppable(self) -> bool:
+        return self.frame.type in DROPPABLE_TYPES
+
+
+class DeviceConnection:
+    """A device socket with a bounded outbound queue drained by its own writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        device_id: str,
+        on_failure: Callable[["DeviceConnection"], Awaitable[None]],
+        on_sent: Callable[[float], None] = None,
+        max_queue_size: int = None,
+        policy: str = None
+    ):
+        self.websocket = websocket
+        self.device_id = device_id
+        self.max_queue_size = max_queue_size or settings.WS_QUEUE_MAX_SIZE
+        self.policy = policy or settings.WS_QUEUE_POLICY
+        self.dropped = 0
+        self.closed = False
+
+        self._on_failure = on_failure
+        self._on_sent = on_sent
+        self._queue: Deque[OutboundMessage] = deque()
+        self._pending: Dict[Hashable, OutboundMessage] = {}
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the writer task."""
+        self._writer = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop the writer task and discard anything still queued."""
+        self.closed = True
+        self._queue.clear()
+        self._pending.clear()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: Frame) -> bool:
+        """Queue a frame without waiting; returns False if the connection was given up."""
+        if self.closed:
+            return False
+
+        key = coalesce_key(frame)
+        if self.policy == POLICY_COALESCE and key is not None and key in self._pending:
+            # Replace the queued copy in place so ordering is preserved
+            self._pending[key].frame = frame
+            return True
+
+        if len(self._queue) >= self.max_queue_size and not self._make_room():
+            logger.warning(
+                f"Outbound queue for device {self.device_id} exceeded "
+                f"{self.max_queue_size} messages, disconnecting"
+            )
+            self._fail()
+            return False
+
+        item = OutboundMessage(frame, key)
+        self._queue.append(item)
+        if key is not None:
+            self._pending[key] = item
+        self._wakeup.set()
+        return True
+
+    def _make_room(self) -> bool:
+        """Apply the backpressure policy to a full queue."""
+        if self.policy == POLICY_DISCONNECT:
+            return False
+
+        for item in self._queue:
+            if item.droppable:
+                self._queue.remove(item)
+                self._forget(item)
+                self.dropped += 1
+                return True
+
+        # Nothing left that is safe to drop; the client is stuck
+        return False
+
+    def _forget(self, item: OutboundMessage):
+        if item.key is not None and self._pending.get(item.key) is item:
+            del self._pending[item.key]
+
+    def _fail(self):
+        """Hand the connection back to its owner for cleanup."""
+        if not self.closed:
+            self.stop()
+            asyncio.create_task(self._on_failure(self))
+
+    async def _run(self):
+        """Writer loop: drain the queue one message at a time."""
+        while not self.closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            item = self._queue.popleft()
+            self._forget(item)
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(item.frame.text),
+                    timeout=settings.WS_SEND_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Device {self.device_id} missed the {settings.WS_SEND_TIMEOUT_SECONDS}s "
+                    f"send deadline, dropping slow connection"
+                )
+                self._fail()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sending message to device {self.device_id}: {e}")
+                self._fail()
+                return
+
+            if self._on_sent:
+                self._on_sent((time.perf_counter() - item.enqueued_at) * 1000)
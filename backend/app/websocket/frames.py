@@ -0,0 +1,33 @@
+from typing import Any
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to stdlib json
+    orjson = None
+
+
+def encode_json(message: Any) -> str:
+    """Encode a message to JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+class Frame:
+    """A message encoded once and shared by every recipient."""
+
+    __slots__ = ("message", "text")
+
+    def __init__(self, message: dict, text: str = None):
+        self.message = message
+        self.text = text if text is not None else encode_json(message)
+
+    @classmethod
+    def from_text(cls, text: str) -> "Frame":
+        """Rebuild a frame received already encoded, without re-encoding it."""
+        return cls(json.loads(text), text)
+
+    @property
+    def type(self) -> str:
+        return self.message.get("type")
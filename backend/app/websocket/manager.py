@@ -1,19 +1,39 @@
 from fastapi import WebSocket
-from typing import Dict, Set
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
 import json
 import asyncio
+import uuid
 from datetime import datetime
 import logging
+from app.config import settings
+from app.utils.metrics import LatencyWindow
+from app.websocket.backplane import Backplane
+from app.websocket.connection import DeviceConnection
+from app.websocket.frames import Frame
 
 logger = logging.getLogger(__name__)
 
+# Close code sent to a socket replaced by a newer one for the same device;
+# clients must not auto-reconnect on it
+WS_CLOSE_SUPERSEDED = 4000
+
 
 class ConnectionManager:
     """Manages WebSocket connections and routes messages."""
 
     def __init__(self):
-        # device_id -> WebSocket connection
-        self.active_connections: Dict[str, WebSocket] = {}
+        # Identifies this worker on the backplane
+        self.worker_id = uuid.uuid4().hex
+
+        # Routes messages for devices connected to other workers (None = single worker)
+        self.backplane: Optional[Backplane] = None
+
+        # device_id -> worker_id for devices connected to other workers, as announced
+        # over the backplane (a worker that crashes leaves its entries until they reconnect)
+        self.remote_devices: Dict[str, str] = {}
+
+        # device_id -> connection (socket + outbound queue)
+        self.active_connections: Dict[str, DeviceConnection] = {}
 
         # user_id -> Set of device_ids
         self.user_devices: Dict[int, Set[str]] = {}
@@ -24,6 +44,20 @@ class ConnectionManager:
         # device_id -> group_ids mapping
         self.device_groups: Dict[str, Set[int]] = {}
 
+        # group_id -> Set of connected device_ids (inverse of device_groups)
+        self.group_devices: Dict[int, Set[str]] = {}
+
+        # Backplane target -> handler for envelopes that carry data rather than a
+        # frame (e.g. cache invalidations); registered by the app at startup
+        self.event_handlers: Dict[str, Callable[[list], None]] = {}
+
+        # Runs the app's offline handling for sockets that die without a clean close
+        self.on_connection_lost: Optional[Callable[[str, WebSocket], Awaitable[None]]] = None
+
+        # Delivery metrics
+        self.delivery_latency = LatencyWindow()
+        self.dropped_connections = 0
+
     async def connect(
         self,
         websocket: WebSocket,
@@ -33,7 +67,24 @@ class ConnectionManager:
     ):
         """Register a new device connection."""
         await websocket.accept()
-        self.active_connections[device_id] = websocket
+        previous = self.active_connections.get(device_id)
+        if previous:
+            # Same device reconnected; the old socket is stale even if still open
+            previous.stop()
+            asyncio.create_task(self.close_socket(
+                previous.websocket,
+                code=WS_CLOSE_SUPERSEDED,
+                reason="Superseded by a new connection"
+            ))
+
+        connection = DeviceConnection(
+            websocket,
+            device_id,
+            on_failure=self._drop_connection,
+            on_sent=self.delivery_latency.record
+        )
+        self.active_connections[device_id] = connection
+        connection.start()
         self.device_users[device_id] = user_id
 
         # Track devices per user
@@ -41,18 +92,31 @@ class ConnectionManager:
             self.user_devices[user_id] = set()
         self.user_devices[user_id].add(device_id)
 
-        # Track groups for device
-        if group_ids:
-            self.device_groups[device_id] = group_ids
-        else:
-            self.device_groups[device_id] = set()
+        # Track groups for device (re-index if the device reconnects)
+        self._unindex_groups(device_id)
+        self.device_groups[device_id] = set(group_ids) if group_ids else set()
+        for group_id in self.device_groups[device_id]:
+            self.group_devices.setdefault(group_id, set()).add(device_id)
+
+        self.remote_devices.pop(device_id, None)
+        await self._publish("device_online", device_id)
 
         logger.info(f"Device {device_id} (user {user_id}) connected")
 
-    async def disconnect(self, device_id: str):
-        """Unregister a device connection."""
-        if device_id in self.active_connections:
-            del self.active_connections[device_id]
+    async def disconnect(self, device_id: str, websocket: WebSocket = None) -> bool:
+        """Unregister a device connection.
+
+        When websocket is given, only unregister if it is still the device's
+        current socket; returns False if it was superseded or already gone.
+        """
+        connection = self.active_connections.get(device_id)
+        if connection is None:
+            return False
+        if websocket is not None and connection.websocket is not websocket:
+            return False
+
+        del self.active_connections[device_id]
+        connection.stop()
 
         if device_id in self.device_users:
             user_id = self.device_users[device_id]
@@ -63,51 +127,83 @@ class ConnectionManager:
                 if not self.user_devices[user_id]:
                     del self.user_devices[user_id]
 
-        if device_id in self.device_groups:
-            del self.device_groups[device_id]
+        self._unindex_groups(device_id)
+        await self._publish("device_offline", device_id)
 
         logger.info(f"Device {device_id} disconnected")
+        return True
+
+    def _unindex_groups(self, device_id: str):
+        """Remove a device from device_groups and the group_devices index."""
+        for group_id in self.device_groups.pop(device_id, ()):
+            members = self.group_devices.get(group_id)
+            if members is not None:
+                members.discard(device_id)
+                if not members:
+                    del self.group_devices[group_id]
 
     async def send_to_device(self, device_id: str, message: dict) -> bool:
-        """Send a message to a specific device."""
-        if device_id in self.active_connections:
-            try:
-                websocket = self.active_connections[device_id]
-                await websocket.send_json(message)
-                logger.debug(f"Message sent to device {device_id}")
-                return True
-            except Exception as e:
-                logger.error(f"Error sending message to device {device_id}: {e}")
-                # Remove connection if it's broken
-                await self.disconnect(device_id)
-                return False
+        """Queue a message for a specific device without waiting on its socket."""
+        return await self.send_frame_to_device(device_id, Frame(message))
+
+    async def send_frame_to_device(self, device_id: str, frame: Frame) -> bool:
+        """Queue a pre-encoded frame for a specific device, wherever it is connected."""
+        connection = self.active_connections.get(device_id)
+        if connection is not None:
+            return connection.enqueue(frame)
+
+        # Not ours; hand it to the worker holding the socket, if any does
+        if self.backplane is not None and device_id in self.remote_devices:
+            await self._publish("device", device_id, frame)
+            return True
         return False
 
+    async def _drop_connection(self, connection: DeviceConnection):
+        """Tear down a connection whose writer failed or fell too far behind."""
+        self.dropped_connections += 1
+        await self.close_socket(connection.websocket)
+        await self.connection_lost(connection.device_id, connection.websocket)
+
+    async def connection_lost(self, device_id: str, websocket: WebSocket):
+        """Unregister a socket we gave up on and run the offline handling."""
+        if self.on_connection_lost is not None:
+            await self.on_connection_lost(device_id, websocket)
+        else:
+            await self.disconnect(device_id, websocket)
+
+    async def close_socket(self, websocket: WebSocket, code: int = 1000, reason: str = None):
+        """Close a socket we are done with, ignoring errors and slow peers."""
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=code, reason=reason),
+                timeout=settings.WS_SEND_TIMEOUT_SECONDS
+            )
+        except Exception:
+            pass
+
+    async def _fan_out(self, device_ids: Iterable[str], frame: Frame) -> int:
+        """Queue one frame for many devices; returns how many accepted it."""
+        # Copy: an overflowing queue disconnects and mutates the indexes
+        delivered = 0
+        for device_id in list(device_ids):
+            if await self.send_frame_to_device(device_id, frame):
+                delivered += 1
+        return delivered
+
     async def send_to_group_devices(self, group_id: int, message: dict):
         """Send a message to all devices in a group."""
-        disconnected = []
-        for device_id, groups in self.device_groups.items():
-            if group_id in groups:
-                success = await self.send_to_device(device_id, message)
-                if not success:
-                    disconnected.append(device_id)
+        await self.send_frame_to_group_devices(group_id, Frame(message))
 
-        # Clean up disconnected devices
-        for device_id in disconnected:
-            await self.disconnect(device_id)
+    async def send_frame_to_group_devices(self, group_id: int, frame: Frame):
+        """Send a pre-encoded frame to all devices in a group."""
+        await self._fan_out(self.group_devices.get(group_id, ()), frame)
+        await self._publish("groups", [group_id], frame)
 
     async def send_to_user_devices(self, user_id: int, message: dict):
         """Send a message to all devices of a user."""
-        if user_id in self.user_devices:
-            disconnected = []
-            for device_id in self.user_devices[user_id]:
-                success = await self.send_to_device(device_id, message)
-                if not success:
-                    disconnected.append(device_id)
-
-            # Clean up disconnected devices
-            for device_id in disconnected:
-                await self.disconnect(device_id)
+        frame = Frame(message)
+        await self._fan_out(self.user_devices.get(user_id, ()), frame)
+        await self._publish("user", user_id, frame)
 
     async def broadcast_device_status(self, device_id: str, group_ids: Set[int], online: bool, device_name: str = None):
         """Broadcast a device's online status to all devices in its groups."""
@@ -119,21 +215,205 @@ class ConnectionManager:
             "timestamp": datetime.utcnow().isoformat()
         }
 
+        frame = Frame(message)
+        await self._fan_out(self._group_recipients(group_ids), frame)
+        await self._publish("groups", list(group_ids), frame)
+
+    async def send_status_changes(self, changes: List[dict]):
+        """Deliver a batch of status changes with at most one frame per recipient.
+
+        Each change is a device_status_changed payload plus the "group_ids" it
+        should reach. A recipient affected by a single change gets a plain
+        device_status_changed frame; one affected by several gets a single
+        device_status_batch frame. Recipients with the same set of changes
+        share one encoded frame.
+        """
+        self._deliver_status_changes(changes)
+        # A reconnect storm can exceed the backplane's payload limit in one tick
+        await self._publish_chunked("status_changes", changes)
+
+    def _deliver_status_changes(self, changes: List[dict]):
+        # recipient device_id -> indexes into changes
+        per_recipient: Dict[str, List[int]] = {}
+        for index, change in enumerate(changes):
+            for device_id in self._group_recipients(change["group_ids"]):
+                per_recipient.setdefault(device_id, []).append(index)
+
+        frames: Dict[tuple, Frame] = {}
+        for device_id, indexes in per_recipient.items():
+            key = tuple(indexes)
+            frame = frames.get(key)
+            if frame is None:
+                statuses = [
+                    {k: v for k, v in changes[i].items() if k != "group_ids"}
+                    for i in indexes
+                ]
+                if len(statuses) == 1:
+                    frame = Frame(statuses[0])
+                else:
+                    frame = Frame({
+                        "type": "device_status_batch",
+                        "statuses": statuses,
+                        "timestamp": datetime.utcnow().isoformat()
+                    })
+                frames[key] = frame
+
+            connection = self.active_connections.get(device_id)
+            if connection is not None:
+                connection.enqueue(frame)
+
+    def _group_recipients(self, group_ids: Iterable[int]) -> Set[str]:
+        """Local devices in any of the groups; shared members appear once."""
+        recipients = set()
         for group_id in group_ids:
-            await self.send_to_group_devices(group_id, message)
+            recipients.update(self.group_devices.get(group_id, ()))
+        return recipients
+
+    async def attach_backplane(self, backplane: Backplane):
+        """Start routing messages to and from other workers through a backplane."""
+        self.backplane = backplane
+        await backplane.start(self._deliver_remote)
+        # Learn which devices the other workers already hold
+        await self._publish("sync_request", None)
+
+    async def detach_backplane(self):
+        """Stop the backplane, if one is attached."""
+        if self.backplane is not None:
+            await self._publish("worker_stopped", None)
+            await self.backplane.stop()
+            self.backplane = None
+        self.remote_devices.clear()
+
+    def _envelope(self, target: str, target_id, frame: Frame = None) -> dict:
+        return {
+            "origin": self.worker_id,
+            "target": target,
+            "id": target_id,
+            "frame": frame.text if frame is not None else None,
+        }
+
+    async def _publish(self, target: str, target_id, frame: Frame = None):
+        """Hand a frame to the backplane for devices connected to other workers."""
+        if self.backplane is None:
+            return
+        try:
+            await self.backplane.publish(self._envelope(target, target_id, frame))
+        except Exception as e:
+            logger.error(f"Backplane publish failed: {e}")
+
+    async def publish_event(self, target: str, items: list):
+        """Send a list to the event_handlers registered for target on other workers."""
+        await self._publish_chunked(target, items)
+
+    async def _publish_chunked(self, target: str, items: list):
+        """Publish a list, split over as many envelopes as the backplane's size limit needs."""
+        if self.backplane is None:
+            return
+        limit = self.backplane.max_payload_bytes
+        if limit is not None and len(items) > 1:
+            size = len(json.dumps(
+                self._envelope(target, items), separators=(",", ":")
+            ).encode("utf-8"))
+            if size > limit:
+                middle = len(items) // 2
+                await self._publish_chunked(target, items[:middle])
+                await self._publish_chunked(target, items[middle:])
+                return
+        await self._publish(target, items)
+
+    async def _deliver_remote(self, envelope: dict):
+        """Deliver an envelope from another worker to the sockets held here."""
+        origin = envelope.get("origin")
+        if origin == self.worker_id:
+            return
+
+        target = envelope.get("target")
+        if target == "status_changes":
+            self._deliver_status_changes(envelope["id"])
+            return
+        if target == "device_online":
+            device_id = envelope["id"]
+            self.remote_devices[device_id] = origin
+            connection = self.active_connections.get(device_id)
+            if connection is not None:
+                # The device reconnected to another worker; our socket is stale
+                # and would swallow everything sent to it until the reaper runs
+                connection.stop()
+                asyncio.create_task(self.close_socket(
+                    connection.websocket,
+                    code=WS_CLOSE_SUPERSEDED,
+                    reason="Superseded by a connection on another worker"
+                ))
+                await self.connection_lost(device_id, connection.websocket)
+            return
+        if target == "device_offline":
+            if self.remote_devices.get(envelope["id"]) == origin:
+                del self.remote_devices[envelope["id"]]
+            return
+        if target == "devices":
+            for device_id in envelope["id"]:
+                if device_id not in self.active_connections:
+                    self.remote_devices[device_id] = origin
+            return
+        if target == "worker_stopped":
+            for device_id, worker_id in list(self.remote_devices.items()):
+                if worker_id == origin:
+                    del self.remote_devices[device_id]
+            return
+        if target == "sync_request":
+            if self.active_connections:
+                await self._publish_chunked("devices", list(self.active_connections))
+            return
+        if target in self.event_handlers:
+            self.event_handlers[target](envelope["id"])
+            return
+        if target == "backplane_reconnected":
+            # Announcements may have been missed while the backplane was down
+            self.remote_devices.clear()
+            await self._publish("sync_request", None)
+            return
+
+        frame = Frame.from_text(envelope["frame"])
+        if target == "device":
+            connection = self.active_connections.get(envelope["id"])
+            if connection is not None:
+                connection.enqueue(frame)
+        elif target == "user":
+            await self._fan_out(self.user_devices.get(envelope["id"], ()), frame)
+        elif target == "groups":
+            await self._fan_out(self._group_recipients(envelope["id"]), frame)
+        else:
+            logger.warning(f"Unknown backplane target: {target}")
+
+    def get_stats(self) -> dict:
+        """Snapshot of connection and delivery metrics."""
+        connections = list(self.active_connections.values())
+        return {
+            "connections": len(connections),
+            "queued_messages": sum(c.queue_size() for c in connections),
+            "dropped_messages": sum(c.dropped for c in connections),
+            "dropped_connections": self.dropped_connections,
+            "remote_devices": len(self.remote_devices),
+            # Enqueue-to-socket latency over the most recent sends
+            "delivery_latency": self.delivery_latency.summary(),
+        }
 
     def get_online_devices_in_group(self, group_id: int) -> list[str]:
         """Get all online devices in a group."""
-        online_devices = []
-        for device_id, groups in self.device_groups.items():
-            if group_id in groups and device_id in self.active_connections:
-                online_devices.append(device_id)
-        return online_devices
+        return [
+            device_id
+            for device_id in self.group_devices.get(group_id, ())
+            if device_id in self.active_connections
+        ]
 
     def is_device_online(self, device_id: str) -> bool:
         """Check if a device is currently online."""
         return device_id in self.active_connections
 
+    def is_device_connected(self, device_id: str) -> bool:
+        """Check if a device is connected here or, as announced over the backplane, to another worker."""
+        return device_id in self.active_connections or device_id in self.remote_devices
+
 
 # Global connection manager instance
 manager = ConnectionManager()
@@ -0,0 +1,137 @@
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import math
+import time
+import logging
+from app.config import settings
+from app.websocket.manager import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """Hashed timing wheel of per-key deadlines.
+
+    The wheel has enough slots to cover the longest delay, so keys found in
+    the slot being advanced over are normally all due; scheduling, cancelling
+    and each tick cost O(1) plus the number of keys that actually expire.
+    """
+
+    def __init__(self, tick_seconds: float, max_delay_seconds: float):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Set[str]] = [
+            set() for _ in range(math.ceil(max_delay_seconds / tick_seconds) + 1)
+        ]
+        # key -> (slot index, deadline tick)
+        self._deadlines: Dict[str, Tuple[int, int]] = {}
+        self._started = time.monotonic()
+        self._current_tick = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self._started) / self.tick_seconds)
+
+    def schedule(self, key: str, delay_seconds: float):
+        """Set (or move) the deadline for a key."""
+        self.cancel(key)
+        ticks = min(
+            max(1, math.ceil(delay_seconds / self.tick_seconds)),
+            len(self._slots) - 1
+        )
+        deadline = self._now_tick() + ticks
+        slot = deadline % len(self._slots)
+        self._slots[slot].add(key)
+        self._deadlines[key] = (slot, deadline)
+
+    def cancel(self, key: str):
+        """Forget a key's deadline."""
+        entry = self._deadlines.pop(key, None)
+        if entry is not None:
+            self._slots[entry[0]].discard(key)
+
+    def advance(self) -> List[str]:
+        """Move the wheel up to the current time and return keys that expired."""
+        expired = []
+        target = self._now_tick()
+        while self._current_tick < target:
+            self._current_tick += 1
+            slot = self._slots[self._current_tick % len(self._slots)]
+            for key in list(slot):
+                # Only a stalled loop can leave next-round keys in this slot
+                if self._deadlines[key][1] <= self._current_tick:
+                    slot.discard(key)
+                    del self._deadlines[key]
+                    expired.append(key)
+        return expired
+
+
+class ConnectionReaper:
+    """Closes connections that stopped sending anything without a clean close."""
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        idle_timeout: float = None,
+        tick_seconds: float = None
+    ):
+        self.manager = connection_manager
+        self.idle_timeout = idle_timeout or settings.WS_IDLE_TIMEOUT_SECONDS
+        self.wheel = TimingWheel(
+            tick_seconds or settings.WS_REAPER_TICK_SECONDS,
+            self.idle_timeout
+        )
+        self.reaped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, device_id: str):
+        """Push back a connection's idle deadline (on connect and every message)."""
+        self.wheel.schedule(device_id, self.idle_timeout)
+
+    def forget(self, device_id: str):
+        """Stop tracking a connection that has gone away."""
+        self.wheel.cancel(device_id)
+
+    async def start(self):
+        """Start the reaping task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            for device_id in self.wheel.advance():
+                try:
+                    await self._reap(device_id)
+                except Exception as e:
+                    logger.error(f"Failed to reap device {device_id}: {e}")
+
+    async def _reap(self, device_id: str):
+        connection = self.manager.active_connections.get(device_id)
+        if connection is None:
+            return
+
+        logger.info(
+            f"Device {device_id} idle for {self.idle_timeout}s, closing connection"
+        )
+        self.reaped += 1
+        websocket = connection.websocket
+        await self.manager.close_socket(websocket, code=1001, reason="Idle timeout")
+        await self.manager.connection_lost(device_id, websocket)
+
+    def get_stats(self) -> dict:
+        return {"tracked": len(self.wheel), "reaped": self.reaped}
+
+
+# Global reaper for the global connection manager
+reaper = ConnectionReaper(manager)
@@ -0,0 +1,123 @@
+from typing import Dict, NamedTuple, Optional, Set
+from datetime import datetime
+import asyncio
+import time
+import logging
+from app.config import settings
+from app.websocket.manager import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+class PendingStatus(NamedTuple):
+    online: bool
+    device_name: Optional[str]
+    group_ids: Set[int]
+    due: float
+
+
+class StatusDebouncer:
+    """Collapses bursts of online/offline transitions before they are broadcast.
+
+    The first transition for a device opens a debounce window; later ones
+    only update the pending state. When the window closes, the final state is
+    broadcast if it differs from what peers last saw, and all changes due in
+    the same tick are delivered together (one frame per recipient).
+    """
+
+    def __init__(self, connection_manager: ConnectionManager, window: float = None):
+        self.manager = connection_manager
+        self.window = settings.WS_STATUS_DEBOUNCE_SECONDS if window is None else window
+
+        # device_id -> state waiting for its window to close
+        self._pending: Dict[str, PendingStatus] = {}
+
+        # device_ids peers last saw as online; anything missing is offline
+        self._last_sent: Set[str] = set()
+
+        self.suppressed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, device_id: str, group_ids: Set[int], online: bool, device_name: str = None):
+        """Queue a device's status change for broadcast."""
+        if self.window <= 0:
+            await self.manager.broadcast_device_status(device_id, group_ids, online, device_name)
+            return
+
+        previous = self._pending.get(device_id)
+        if previous is not None:
+            self.suppressed += 1
+            due = previous.due
+            device_name = device_name or previous.device_name
+            group_ids = set(group_ids) | previous.group_ids
+        else:
+            due = time.monotonic() + self.window
+        self._pending[device_id] = PendingStatus(online, device_name, set(group_ids), due)
+
+    async def start(self):
+        if self._task is None and self.window > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the tick task and broadcast whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(force=True)
+
+    async def _run(self):
+        # Tick faster than the window so changes are not held much past their due time
+        interval = max(self.window / 4, 0.05)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Status broadcast failed: {e}")
+
+    async def flush(self, force: bool = False):
+        """Broadcast every change whose debounce window has closed."""
+        now = time.monotonic()
+        due = [
+            device_id for device_id, pending in self._pending.items()
+            if force or pending.due <= now
+        ]
+        if not due:
+            return
+
+        timestamp = datetime.utcnow().isoformat()
+        changes = []
+        for device_id in due:
+            pending = self._pending.pop(device_id)
+            if (device_id in self._last_sent) == pending.online:
+                # e.g. online -> offline -> online inside one window
+                self.suppressed += 1
+                continue
+
+            if pending.online:
+                self._last_sent.add(device_id)
+            else:
+                self._last_sent.discard(device_id)
+
+            changes.append({
+                "type": "device_status_changed",
+                "device_id": device_id,
+                "online": pending.online,
+                "device_name": pending.device_name,
+                "timestamp": timestamp,
+                "group_ids": sorted(pending.group_ids),
+            })
+
+        if changes:
+            await self.manager.send_status_changes(changes)
+
+    def get_stats(self) -> dict:
+        return {"pending": len(self._pending), "suppressed": self.suppressed}
+
+
+# Global debouncer for the global connection manager
+status_debouncer = StatusDebouncer(manager)
@@ -0,0 +1,70 @@
+"""Group fan-out lookups: full scan of device_groups vs. the group_devices index.
+
+Resolves the online devices of one group the way ConnectionManager did before
+group_devices existed (a scan over every connected device) and through the
+index, at 10k and 100k connections, then projects the cost of a reconnect
+wave in which every device's connect triggers one group broadcast.
+
+    cd backend && python -m benchmarks.group_index [--group-size 10]
+"""
+import argparse
+import time
+
+from app.websocket.manager import ConnectionManager
+
+
+def populate(connections: int, group_size: int) -> ConnectionManager:
+    """A manager holding connections devices in groups of group_size, indexed as connect() does."""
+    manager = ConnectionManager()
+    for i in range(connections):
+        device_id = f"device-{i}"
+        group_id = i // group_size
+        # The lookups only read the registries, so no socket is needed
+        manager.active_connections[device_id] = None
+        manager.device_groups[device_id] = {group_id}
+        manager.group_devices.setdefault(group_id, set()).add(device_id)
+    return manager
+
+
+def scan(manager: ConnectionManager, group_id: int) -> list:
+    """get_online_devices_in_group before the group_devices index."""
+    return [
+        device_id
+        for device_id, groups in manager.device_groups.items()
+        if group_id in groups and device_id in manager.active_connections
+    ]
+
+
+def per_lookup(lookup, manager: ConnectionManager, groups: int, repeat: int) -> float:
+    """Mean seconds per lookup, cycling through the groups."""
+    started = time.perf_counter()
+    for i in range(repeat):
+        lookup(manager, i % groups)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--group-size", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'connections':>11}  {'scan/lookup':>12}  {'index/lookup':>12}  {'speedup':>8}  "
+          f"{'scan wave':>10}  {'index wave':>10}")
+    for connections in args.connections:
+        manager = populate(connections, args.group_size)
+        groups = len(manager.group_devices)
+        assert sorted(scan(manager, 3)) == sorted(manager.get_online_devices_in_group(3))
+
+        scanned = per_lookup(scan, manager, groups, repeat=max(20, 2_000_000 // connections))
+        indexed = per_lookup(
+            ConnectionManager.get_online_devices_in_group, manager, groups, repeat=200_000
+        )
+        # One group broadcast per connecting device
+        print(f"{connections:>11,}  {scanned * 1e6:>10.1f}us  {indexed * 1e6:>10.2f}us  "
+              f"{scanned / indexed:>7.0f}x  {scanned * connections:>9.1f}s  "
+              f"{indexed * connections:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
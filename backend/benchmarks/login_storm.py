@@ -0,0 +1,144 @@
+"""Latency of other endpoints during a login storm, bcrypt on the threadpool vs. PasswordHasher.
+
+Serves the app in-process and times GET /health and GET /api/devices/ (both
+sync endpoints on the shared threadpool) while a burst of logins is in
+flight, three times:
+
+- quiet: no logins
+- threadpool: logins verified inline by a sync endpoint, as auth.login did
+  before PasswordHasher
+- hasher: POST /api/auth/login, on the admission-controlled process pool;
+  logins past PASSWORD_HASH_MAX_PENDING get 503 with Retry-After
+
+    cd backend && python -m benchmarks.login_storm [--logins 120] [--probes 100]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import httpx  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.user import UserLogin  # noqa: E402
+from app.services.password_hasher import password_hasher  # noqa: E402
+from app.utils.security import create_access_token, get_password_hash, verify_password  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def login_on_threadpool(credentials: UserLogin):
+    """auth.login before PasswordHasher: bcrypt inline in a sync endpoint."""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == credentials.email).first()
+        if user is None or not verify_password(credentials.password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        return {"id": user.id}
+    finally:
+        db.close()
+
+
+# Ahead of the static files mounted at "/", which would otherwise answer it
+app.add_api_route("/benchmark/login-on-threadpool", login_on_threadpool, methods=["POST"])
+app.router.routes.insert(0, app.router.routes.pop())
+
+
+def seed_user() -> tuple:
+    """A user with a real bcrypt hash; returns (email, access token)."""
+    db = SessionLocal()
+    try:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", password_hash=get_password_hash(PASSWORD))
+        db.add(user)
+        db.commit()
+        return user.email, create_access_token({"sub": str(user.id), "groups": [], "mv": 0})
+    finally:
+        db.close()
+
+
+async def probe(client: httpx.AsyncClient, token: str, count: int, interval: float) -> dict:
+    """Time count calls to each probed endpoint, one pair every interval seconds."""
+    latencies = {"/health": [], "/api/devices/": []}
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(count):
+        for path, samples in latencies.items():
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+            samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, path: str, email: str, logins: int) -> dict:
+    """Send logins all at once; returns status code counts and the Retry-After values seen."""
+    async def login():
+        response = await client.post(path, json={"email": email, "password": PASSWORD})
+        return response.status_code, response.headers.get("Retry-After")
+
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    statuses = {}
+    for status_code, _ in results:
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+    retry_after = {value for status_code, value in results if status_code == 503}
+    return {"statuses": statuses, "retry_after": retry_after}
+
+
+def summarize(samples: list) -> str:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples) * 1000:>7.1f}ms  p99 {p99 * 1000:>7.1f}ms"
+
+
+async def run(args):
+    # Every rejected login logs a warning
+    logging.getLogger("app.services.password_hasher").setLevel(logging.ERROR)
+    email, token = seed_user()
+    password_hasher.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        # Warm the caches and the hasher's worker processes
+        await probe(client, token, 5, 0)
+        await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+
+        scenarios = [
+            ("quiet", None),
+            ("threadpool", "/benchmark/login-on-threadpool"),
+            ("hasher", "/api/auth/login"),
+        ]
+        for label, path in scenarios:
+            probes = asyncio.create_task(probe(client, token, args.probes, args.interval))
+            logins = None
+            if path is not None:
+                logins = asyncio.create_task(storm(client, path, email, args.logins))
+            latencies = await probes
+            print(f"{label}:")
+            for endpoint, samples in latencies.items():
+                print(f"  {endpoint:<15}{summarize(samples)}")
+            if logins is not None:
+                result = await logins
+                print(f"  logins: {dict(sorted(result['statuses'].items()))}"
+                      + (f", Retry-After {sorted(result['retry_after'])}" if result["retry_after"] else ""))
+    password_hasher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=120)
+    parser.add_argument("--probes", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Pushes per second: pooled WebPushClient vs. pywebpush.webpush.
+
+Starts a stand-in push service on localhost (HTTPS with a throwaway
+self-signed certificate, answering every POST with 201) and sends the same
+encrypted payload to it through both paths at the same concurrency:
+
+- pywebpush.webpush, as ring_service called it, on a thread pool: a new
+  requests session, TLS handshake and VAPID signature for every push
+- WebPushClient: one keep-alive client per origin and a cached VAPID JWT
+
+    cd backend && python -m benchmarks.push_client [--pushes 500] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+PAYLOAD = json.dumps({
+    "title": "BUZZER",
+    "body": "Benchmark is buzzing you!",
+    "icon": "/static/images/icon-192.png",
+    "url": "/dashboard.html"
+})
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def write_certificate(directory: str) -> tuple:
+    """Self-signed certificate for 127.0.0.1; returns (cert path, key path)."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.utcnow()
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class PushServiceHandler(BaseHTTPRequestHandler):
+    """Accepts every push, like a push service that queued the message."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_push_service(cert_path: str, key_path: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PushServiceHandler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def subscription_for(endpoint: str) -> dict:
+    """A subscription with real keys, so payloads are encrypted as for a browser."""
+    browser_key = ec.generate_private_key(ec.SECP256R1()).public_key()
+    return {
+        "endpoint": endpoint,
+        "keys": {
+            "p256dh": b64url(browser_key.public_bytes(
+                serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+            )),
+            "auth": b64url(os.urandom(16)),
+        },
+    }
+
+
+def vapid_private_key() -> str:
+    """A VAPID private key in the raw base64url form settings.VAPID_PRIVATE_KEY uses."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    return b64url(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def bench_pywebpush(subscription: dict, private_key: str, pushes: int, concurrency: int) -> float:
+    from pywebpush import webpush
+
+    def push(_):
+        webpush(
+            subscription_info=subscription,
+            data=PAYLOAD,
+            vapid_private_key=private_key,
+            vapid_claims={"sub": "mailto:bench@example.com"}
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        list(pool.map(push, range(pushes)))
+        return time.perf_counter() - started
+
+
+async def bench_client(subscription: dict, private_key: str, pushes: int, concurrency: int) -> float:
+    from app.services.webpush_client import WebPushClient
+
+    client = WebPushClient(private_key, "mailto:bench@example.com")
+    remaining = iter(range(pushes))
+
+    async def worker():
+        for _ in remaining:
+            await client.send(subscription, PAYLOAD.encode(), timeout=10)
+
+    # Connect and sign once outside the timing, as a running worker already has
+    await client.send(subscription, PAYLOAD.encode(), timeout=10)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pushes", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    cert_path, key_path = write_certificate(directory)
+    # Both requests (pywebpush) and httpx trust the stand-in's certificate
+    os.environ["REQUESTS_CA_BUNDLE"] = cert_path
+    os.environ["SSL_CERT_FILE"] = cert_path
+
+    server = start_push_service(cert_path, key_path)
+    endpoint = f"https://127.0.0.1:{server.server_address[1]}/push/bench"
+    subscription = subscription_for(endpoint)
+    private_key = vapid_private_key()
+
+    old = bench_pywebpush(subscription, private_key, args.pushes, args.concurrency)
+    new = asyncio.run(bench_client(subscription, private_key, args.pushes, args.concurrency))
+    server.shutdown()
+
+    print(f"{args.pushes} pushes, concurrency {args.concurrency}")
+    print(f"  pywebpush.webpush  {args.pushes / old:>8.0f} pushes/s")
+    print(f"  WebPushClient      {args.pushes / new:>8.0f} pushes/s  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Event-loop latency under concurrent ring load, sync vs. async database access.
+
+Runs the same batch of concurrent ring starts twice while a ticker measures
+how late the event loop wakes it up:
+
+- sync: the queries start_ring_session ran before the async session path,
+  through SessionLocal directly on the event loop
+- async: ring_service.start_ring_session on AsyncSessionLocal
+
+Every worker's sockets share that loop, so its lag is added to every frame
+the worker sends. Uses DATABASE_URL (a temporary SQLite file by default);
+point it at Postgres to include real network round trips.
+
+    cd backend && python -m benchmarks.ring_loop_latency [--rings 1000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import app.main  # noqa: E402,F401  (creates the tables)
+from app.database import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from app.models.device import Device  # noqa: E402
+from app.models.group import Group, GroupMember  # noqa: E402
+from app.models.ring_session import RingSession  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.ring_service import start_ring_session  # noqa: E402
+from app.websocket.manager import manager  # noqa: E402
+
+TICK_SECONDS = 0.001
+
+
+def seed() -> tuple:
+    """A user in a group with one device; returns (user id, group id, device pk)."""
+    db = SessionLocal()
+    try:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x", full_name="Bench")
+        db.add(user)
+        db.flush()
+        group = Group(name="Bench", owner_id=user.id, invite_code=uuid.uuid4().hex[:20])
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=user.id, role="owner"))
+        device = Device(user_id=user.id, device_id=uuid.uuid4().hex, device_name="Bench phone")
+        db.add(device)
+        db.commit()
+        return user.id, group.id, device.id
+    finally:
+        db.close()
+
+
+async def start_ring_sync(user_id: int, group_id: int, device_pk: int):
+    """start_ring_session before the async session path: blocking queries on the loop."""
+    db = SessionLocal()
+    try:
+        device = db.query(Device).filter(Device.id == device_pk).first()
+        initiator = db.query(User).filter(User.id == user_id).first()
+        ring_session = RingSession(
+            group_id=group_id,
+            initiated_by=user_id,
+            target_device_id=device_pk,
+            status="active"
+        )
+        db.add(ring_session)
+        db.commit()
+        db.refresh(ring_session)
+        await manager.send_to_device(device.device_id, {
+            "type": "ring_command",
+            "ring_session_id": ring_session.id,
+            "initiator_name": initiator.full_name
+        })
+    finally:
+        db.close()
+
+
+async def start_ring_async(user_id: int, group_id: int, device_pk: int):
+    async with AsyncSessionLocal() as db:
+        await start_ring_session(db, group_id, user_id, "Bench", device_pk)
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    """Record how much later than asked the loop resumes a 1ms sleep."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def measure(start_ring, ids: tuple, rings: int, concurrency: int) -> tuple:
+    """Ring rings times from concurrency tasks; returns (loop lags, rings per second)."""
+    remaining = iter(range(rings))
+
+    async def worker():
+        for _ in remaining:
+            await start_ring(*ids)
+            # Each ring is its own request; let the loop run in between
+            await asyncio.sleep(0)
+
+    lags, stop = [], asyncio.Event()
+    ticking = asyncio.create_task(ticker(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticking
+    return lags, rings / elapsed
+
+
+def summarize(lags: list) -> str:
+    lags = sorted(lags)
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    return (f"{len(lags):>5} ticks  loop lag p50 {statistics.median(lags) * 1000:>6.2f}ms  "
+            f"p99 {p99 * 1000:>6.2f}ms  max {lags[-1] * 1000:>7.2f}ms")
+
+
+async def run(args):
+    ids = seed()
+    # Warm both connection pools
+    await start_ring_sync(*ids)
+    await start_ring_async(*ids)
+
+    for label, start_ring in (("sync", start_ring_sync), ("async", start_ring_async)):
+        lags, throughput = await measure(start_ring, ids, args.rings, args.concurrency)
+        print(f"  {label:<6}{summarize(lags)}  {throughput:>7.0f} rings/s")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rings", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    print(f"{args.rings} rings from {args.concurrency} concurrent tasks")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before anything imports app.database
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
@@ -0,0 +1,103 @@
+import asyncio
+import socket
+
+from app.websocket.backplane import PostgresBackplane
+
+
+class FakeNotify:
+    def __init__(self, payload: str):
+        self.payload = payload
+
+
+class FakePgConnection:
+    """Stands in for a psycopg2 connection; a socketpair end provides the fd."""
+
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.notifies = []
+        self.closed = False
+        self.broken = False
+        self.executed = []
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                connection.executed.append(sql)
+
+        return Cursor()
+
+    def poll(self):
+        self.reader.recv(1024)
+        if self.broken:
+            raise OSError("server closed the connection unexpectedly")
+
+    def notify(self, payload: str):
+        self.notifies.append(FakeNotify(payload))
+        self.writer.send(b"x")
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.reader.close()
+            self.writer.close()
+
+
+def test_postgres_backplane_relistens_after_listen_connection_fails():
+    async def scenario():
+        connections = []
+        received = []
+
+        backplane = PostgresBackplane("postgresql://unused", channel="test")
+        # Keep the test fast: the first retry happens after 1s, so cap it lower
+        backplane.reconnect_max_seconds = 0.01
+
+        def connect():
+            connection = FakePgConnection()
+            connections.append(connection)
+            return connection
+
+        backplane._connect = connect
+
+        async def deliver(envelope):
+            received.append(envelope)
+
+        await backplane.start(deliver)
+        listener = connections[0]
+        assert backplane.state == "listening"
+
+        listener.notify('{"n": 1}')
+        await asyncio.sleep(0.05)
+        assert received == [{"n": 1}]
+
+        listener.broken = True
+        listener.writer.send(b"x")
+        await asyncio.sleep(0.2)
+
+        assert listener.closed
+        assert backplane.state == "listening"
+        assert backplane.get_stats()["reconnects"] == 1
+        # The manager is told to resync what it missed while disconnected
+        assert received[-1] == {"origin": None, "target": "backplane_reconnected"}
+        new_listener = backplane._listen_conn
+        assert new_listener is not listener
+        assert 'LISTEN "test"' in new_listener.executed
+
+        new_listener.notify('{"n": 2}')
+        await asyncio.sleep(0.05)
+        assert received[-1] == {"n": 2}
+
+        await backplane.stop()
+        assert backplane.state == "stopped"
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import uuid
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.database import SessionLocal, engine
+from app.models.group import Group, GroupMember
+from app.models.user import User
+from app.services.identity import membership_claims
+from app.utils.security import create_access_token
+
+client = TestClient(app)
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def make_user(db) -> User:
+    user = User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x", full_name="Test")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def make_group(db, owner: User, members: int) -> Group:
+    group = Group(name="Group", owner_id=owner.id, invite_code=uuid.uuid4().hex[:20])
+    db.add(group)
+    db.flush()
+    db.add(GroupMember(group_id=group.id, user_id=owner.id, role="owner"))
+    for _ in range(members):
+        db.add(GroupMember(group_id=group.id, user_id=make_user(db).id, role="member"))
+    return group
+
+
+def headers_for(user_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        group_ids = [
+            group_id for (group_id,) in db.query(GroupMember.group_id).filter(
+                GroupMember.user_id == user_id
+            )
+        ]
+        token = create_access_token(
+            {"sub": str(user_id), **membership_claims(group_ids, user.membership_version)}
+        )
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed(groups: int, members: int):
+    """A user in `groups` groups of `members` other members each; returns (user id, group ids)."""
+    db = SessionLocal()
+    try:
+        owner = make_user(db)
+        group_ids = [make_group(db, owner, members).id for _ in range(groups)]
+        db.commit()
+        return owner.id, group_ids
+    finally:
+        db.close()
+
+
+def statements_for(method: str, url: str, headers: dict, **kwargs) -> int:
+    # Warm the identity cache so only the endpoint's own queries are counted
+    client.get("/api/groups/", headers=headers)
+    with count_statements() as statements:
+        response = client.request(method, url, headers=headers, **kwargs)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_group_listing_query_count_does_not_grow_with_groups_or_members():
+    small_user, _ = seed(groups=1, members=1)
+    large_user, _ = seed(groups=5, members=20)
+
+    small = statements_for("GET", "/api/groups/", headers_for(small_user))
+    large = statements_for("GET", "/api/groups/", headers_for(large_user))
+
+    assert small == large
+    assert large <= 3
+
+
+def test_get_group_query_count_does_not_grow_with_members():
+    small_user, (small_group,) = seed(groups=1, members=1)
+    large_user, (large_group,) = seed(groups=1, members=50)
+
+    small = statements_for("GET", f"/api/groups/{small_group}", headers_for(small_user))
+    large = statements_for("GET", f"/api/groups/{large_group}", headers_for(large_user))
+
+    assert small == large
+    assert large <= 3
+
+
+def test_join_group_query_count_does_not_grow_with_members():
+    db = SessionLocal()
+    try:
+        small_code = db.get(Group, seed(groups=1, members=1)[1][0]).invite_code
+        large_code = db.get(Group, seed(groups=1, members=50)[1][0]).invite_code
+    finally:
+        db.close()
+    first_joiner, _ = seed(groups=0, members=0)
+    second_joiner, _ = seed(groups=0, members=0)
+
+    small = statements_for(
+        "POST", "/api/groups/join", headers_for(first_joiner), json={"invite_code": small_code}
+    )
+    large = statements_for(
+        "POST", "/api/groups/join", headers_for(second_joiner), json={"invite_code": large_code}
+    )
+
+    assert small == large
+    assert large <= 6
@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import SessionLocal
+from app.models.group import Group, GroupMember
+from app.models.user import User
+from app.services.identity import IdentityCache, membership_claims
+from app.utils.security import create_access_token
+from app.websocket.backplane import InProcessBackplane, InProcessHub
+from app.websocket.manager import ConnectionManager, manager
+
+client = TestClient(app)
+
+
+def seed():
+    """An owner with a group and a user in no group; returns (user id, group id, invite code)."""
+    db = SessionLocal()
+    try:
+        owner = User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x")
+        user = User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x")
+        db.add_all([owner, user])
+        db.flush()
+        group = Group(name="Group", owner_id=owner.id, invite_code=uuid.uuid4().hex[:20])
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=owner.id, role="owner"))
+        db.commit()
+        return user.id, group.id, group.invite_code
+    finally:
+        db.close()
+
+
+def test_membership_changes_invalidate_other_workers():
+    user_id, group_id, invite_code = seed()
+    token = create_access_token({"sub": str(user_id), **membership_claims([], 0)})
+
+    hub = InProcessHub()
+    other_worker = ConnectionManager()
+    other_cache = IdentityCache()
+    other_worker.event_handlers["identity_invalidated"] = other_cache.invalidate_many
+    asyncio.run(other_worker.attach_backplane(InProcessBackplane(hub)))
+    asyncio.run(manager.attach_backplane(InProcessBackplane(hub)))
+    try:
+        # The other worker has the user cached from before the join
+        assert not other_cache.is_group_member(other_cache.get(user_id), group_id)
+
+        response = client.post(
+            "/api/groups/join",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"invite_code": invite_code}
+        )
+        assert response.status_code == 200, response.text
+
+        user = other_cache.get(user_id)
+        assert user.membership_version == 1
+        assert other_cache.is_group_member(user, group_id)
+    finally:
+        asyncio.run(manager.detach_backplane())
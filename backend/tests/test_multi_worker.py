@@ -0,0 +1,176 @@
+import asyncio
+import json
+
+from app.websocket.backplane import InProcessBackplane, InProcessHub
+from app.websocket.frames import Frame
+from app.websocket.manager import WS_CLOSE_SUPERSEDED, ConnectionManager
+
+
+class FakeWebSocket:
+    """Records what the connection writer sends."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.closed = True
+        self.close_code = code
+
+
+async def two_workers():
+    hub = InProcessHub()
+    first, second = ConnectionManager(), ConnectionManager()
+    await first.attach_backplane(InProcessBackplane(hub))
+    await second.attach_backplane(InProcessBackplane(hub))
+    return first, second
+
+
+def test_ring_reaches_a_device_connected_to_another_worker():
+    async def scenario():
+        first, second = await two_workers()
+        socket = FakeWebSocket()
+        await second.connect(socket, "phone", user_id=1, group_ids={7})
+
+        delivered = await first.send_frame_to_device(
+            "phone", Frame({"type": "ring_command", "ring_session_id": 42})
+        )
+        await asyncio.sleep(0.01)
+
+        assert delivered
+        assert not first.is_device_online("phone")
+        assert socket.sent == [{"type": "ring_command", "ring_session_id": 42}]
+
+    asyncio.run(scenario())
+
+
+def test_group_messages_reach_devices_on_every_worker():
+    async def scenario():
+        first, second = await two_workers()
+        local, remote = FakeWebSocket(), FakeWebSocket()
+        await first.connect(local, "tablet", user_id=1, group_ids={7})
+        await second.connect(remote, "phone", user_id=2, group_ids={7})
+
+        await first.send_to_group_devices(7, {"type": "hello"})
+        await asyncio.sleep(0.01)
+
+        assert local.sent == [{"type": "hello"}]
+        assert remote.sent == [{"type": "hello"}]
+
+    asyncio.run(scenario())
+
+
+def test_device_connected_nowhere_is_not_reported_as_relayed():
+    async def scenario():
+        first, second = await two_workers()
+        socket = FakeWebSocket()
+        await second.connect(socket, "phone", user_id=1)
+
+        assert not await first.send_frame_to_device("laptop", Frame({"type": "ring_command"}))
+
+        await second.disconnect("phone")
+        assert not await first.send_frame_to_device("phone", Frame({"type": "ring_command"}))
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_on_another_worker_supersedes_the_stale_socket():
+    async def scenario():
+        first, second = await two_workers()
+        stale, fresh = FakeWebSocket(), FakeWebSocket()
+        await first.connect(stale, "phone", user_id=1, group_ids={7})
+        await second.connect(fresh, "phone", user_id=1, group_ids={7})
+        await asyncio.sleep(0.01)
+
+        assert stale.closed and stale.close_code == WS_CLOSE_SUPERSEDED
+        assert not first.is_device_online("phone")
+        assert first.get_online_devices_in_group(7) == []
+        assert first.remote_devices == {"phone": second.worker_id}
+        assert second.remote_devices == {}
+
+        assert await first.send_frame_to_device(
+            "phone", Frame({"type": "ring_command", "ring_session_id": 42})
+        )
+        await asyncio.sleep(0.01)
+
+        assert stale.sent == []
+        assert fresh.sent == [{"type": "ring_command", "ring_session_id": 42}]
+
+    asyncio.run(scenario())
+
+
+def test_late_worker_learns_devices_already_connected_elsewhere():
+    async def scenario():
+        hub = InProcessHub()
+        first = ConnectionManager()
+        await first.attach_backplane(InProcessBackplane(hub))
+        socket = FakeWebSocket()
+        await first.connect(socket, "phone", user_id=1)
+
+        second = ConnectionManager()
+        await second.attach_backplane(InProcessBackplane(hub))
+        assert second.remote_devices == {"phone": first.worker_id}
+
+        await first.detach_backplane()
+        assert second.remote_devices == {}
+
+    asyncio.run(scenario())
+
+
+class RecordingBackplane(InProcessBackplane):
+    """In-process backplane that enforces the Postgres NOTIFY size limit."""
+
+    max_payload_bytes = 7999
+
+    def __init__(self, hub: InProcessHub):
+        super().__init__(hub)
+        self.payload_sizes = []
+
+    async def publish(self, envelope: dict):
+        size = len(json.dumps(envelope, separators=(",", ":")).encode("utf-8"))
+        self.payload_sizes.append(size)
+        assert size <= self.max_payload_bytes
+        await super().publish(envelope)
+
+
+def test_status_change_storm_is_split_under_the_payload_limit():
+    async def scenario():
+        hub = InProcessHub()
+        first, second = ConnectionManager(), ConnectionManager()
+        backplane = RecordingBackplane(hub)
+        await first.attach_backplane(backplane)
+        await second.attach_backplane(InProcessBackplane(hub))
+        watcher = FakeWebSocket()
+        await second.connect(watcher, "watcher", user_id=1, group_ids={7})
+
+        changes = [
+            {
+                "type": "device_status_changed",
+                "device_id": f"device-{i:04d}-0123456789abcdef0123456789abcdef",
+                "online": True,
+                "device_name": f"Phone number {i}",
+                "timestamp": "2026-10-17T12:00:00.000000",
+                "group_ids": [7, 8, 9],
+            }
+            for i in range(200)
+        ]
+        backplane.payload_sizes.clear()
+        await first.send_status_changes(changes)
+        await asyncio.sleep(0.01)
+
+        assert len(backplane.payload_sizes) > 1
+        received = [
+            status["device_id"]
+            for frame in watcher.sent
+            for status in frame.get("statuses", [frame])
+        ]
+        assert received == [change["device_id"] for change in changes]
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services.push_subscriptions import Subscription, SubscriptionCache
+from app.websocket.backplane import InProcessBackplane, InProcessHub
+from app.websocket.manager import ConnectionManager, manager
+
+SUBSCRIPTION = Subscription(
+    id=1, device_pk=5, endpoint="https://push.example.com/abc", origin="https://push.example.com",
+    info={"endpoint": "https://push.example.com/abc", "keys": {"p256dh": "p", "auth": "a"}}
+)
+
+
+def cached(cache: SubscriptionCache, device_pk: int):
+    entry = cache._entries.get(device_pk)
+    return entry[0] if entry is not None else "missing"
+
+
+def test_load_started_before_an_invalidation_does_not_overwrite_it():
+    cache = SubscriptionCache()
+    # A handshake reads the generation, then queries and finds no subscription...
+    generation = cache.generation()
+    # ...while a subscribe commits and invalidates
+    cache.invalidate(5)
+    cache.put(5, None, generation)
+    assert cached(cache, 5) == "missing"
+
+    # A load that starts after the invalidation is cached normally
+    cache.put(5, SUBSCRIPTION, cache.generation())
+    assert cached(cache, 5) == SUBSCRIPTION
+
+
+def test_devices_without_a_subscription_expire_sooner():
+    cache = SubscriptionCache(ttl=60, miss_ttl=0.01)
+    cache.put(5, None)
+    cache.put(6, SUBSCRIPTION)
+
+    class NoDatabase:
+        async def scalar(self, statement):
+            return None
+
+    async def scenario():
+        await asyncio.sleep(0.02)
+        assert await cache.get(NoDatabase(), 6) == SUBSCRIPTION
+        hits = cache.hits
+        assert await cache.get(NoDatabase(), 5) is None
+        assert cache.hits == hits
+        assert cache.misses == 1
+
+    asyncio.run(scenario())
+
+
+def test_invalidations_reach_other_workers():
+    async def scenario():
+        hub = InProcessHub()
+        other_worker = ConnectionManager()
+        other_cache = SubscriptionCache()
+        other_worker.event_handlers["push_subscription_invalidated"] = other_cache.invalidate_many
+        await other_worker.attach_backplane(InProcessBackplane(hub))
+        await manager.attach_backplane(InProcessBackplane(hub))
+        try:
+            other_cache.put(5, None)
+            await SubscriptionCache().invalidate_everywhere([5])
+            assert cached(other_cache, 5) == "missing"
+        finally:
+            await manager.detach_backplane()
+
+    asyncio.run(scenario())
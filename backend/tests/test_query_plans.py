@@ -0,0 +1,138 @@
+import asyncio
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, text
+
+from app.main import app
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models.device import Device
+from app.models.group import Group, GroupMember
+from app.models.ring_session import RingSession
+from app.models.user import User
+from app.services.identity import IdentityCache, UserSnapshot, membership_claims
+from app.services.ring_service import ring_history
+from app.utils.security import create_access_token
+
+client = TestClient(app)
+
+USERS = 400
+DEVICES_PER_USER = 2
+GROUP_SIZE = 10
+RING_SESSIONS = 50_000
+
+
+@contextmanager
+def capture_statements(target):
+    """Record (statement, parameters) for every query run on target's engine."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(target, "before_cursor_execute", record)
+
+
+def query_plan(statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def seed():
+    """Users in groups, two devices each and RING_SESSIONS rings between them, then ANALYZE.
+
+    Returns (a user id, their group id).
+    """
+    rng = random.Random(1)
+    db = SessionLocal()
+    try:
+        users = [User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x") for _ in range(USERS)]
+        db.add_all(users)
+        db.flush()
+        groups = []
+        for start in range(0, USERS, GROUP_SIZE):
+            group = Group(name="Group", owner_id=users[start].id, invite_code=uuid.uuid4().hex[:20])
+            db.add(group)
+            db.flush()
+            groups.append(group.id)
+            db.add_all(
+                GroupMember(group_id=group.id, user_id=user.id, role="member")
+                for user in users[start:start + GROUP_SIZE]
+            )
+        devices = [
+            Device(user_id=user.id, device_id=uuid.uuid4().hex, device_name="Phone")
+            for user in users
+            for _ in range(DEVICES_PER_USER)
+        ]
+        db.add_all(devices)
+        db.flush()
+
+        started_at = datetime.utcnow() - timedelta(days=20)
+        db.execute(insert(RingSession), [
+            {
+                "group_id": groups[0],
+                "initiated_by": rng.choice(users).id,
+                "target_device_id": rng.choice(devices).id,
+                "status": "completed",
+                "started_at": started_at + timedelta(seconds=30 * i),
+            }
+            for i in range(RING_SESSIONS)
+        ])
+        db.commit()
+        db.execute(text("ANALYZE"))
+        db.commit()
+        return users[0].id, groups[0]
+    finally:
+        db.close()
+
+
+def test_hot_queries_use_their_indexes():
+    user_id, group_id = seed()
+
+    # Ring history, first page and a later one
+    async def history():
+        async with AsyncSessionLocal() as db:
+            rows = await ring_history(db, user_id, None, 20)
+            await ring_history(db, user_id, (rows[-1].started_at, rows[-1].id), 20)
+
+    with capture_statements(async_engine.sync_engine) as statements:
+        asyncio.run(history())
+    plans = [query_plan(*statement) for statement in statements]
+    device_plans = [plan for plan, (sql, _) in zip(plans, statements) if "ring_sessions" not in sql]
+    history_plans = [plan for plan, (sql, _) in zip(plans, statements) if "ring_sessions" in sql]
+    assert len(history_plans) == 2
+    for plan in device_plans:
+        assert "ix_devices_user_id" in plan
+    for plan in history_plans:
+        assert "ix_ring_sessions_initiated_by_started_at" in plan
+        assert "ix_ring_sessions_target_device_id_started_at" in plan
+        assert "ix_ring_sessions_archive_initiated_by_started_at" in plan
+        assert "ix_ring_sessions_archive_target_device_id_started_at" in plan
+        assert "SCAN ring_sessions" not in plan
+
+    # Membership lookup when the token's claim is stale
+    with capture_statements(engine) as statements:
+        IdentityCache().group_ids(UserSnapshot(id=user_id, email="", full_name=None))
+    (membership_plan,) = [query_plan(*statement) for statement in statements]
+    assert "COVERING INDEX ix_group_members_user_id_group_id" in membership_plan
+
+    # Devices of a group's members
+    token = create_access_token({"sub": str(user_id), **membership_claims([group_id], 0)})
+    with capture_statements(engine) as statements:
+        response = client.get(
+            f"/api/devices/group/{group_id}", headers={"Authorization": f"Bearer {token}"}
+        )
+    assert response.status_code == 200, response.text
+    (group_devices_plan,) = [
+        query_plan(sql, parameters) for sql, parameters in statements if "FROM devices" in sql
+    ]
+    assert "ix_devices_user_id" in group_devices_plan
+    assert "SCAN devices" not in group_devices_plan
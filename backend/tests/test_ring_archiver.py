@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app.database import SessionLocal
+from app.models.ring_session import RingSession
+from app.models.ring_session_archive import RingSessionArchive
+from app.services.ring_archiver import RingArchiver
+
+
+def seed(ages_in_days):
+    """One ring session per age, in id order; returns their ids."""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.execute(delete(RingSession))
+        db.execute(delete(RingSessionArchive))
+        sessions = [
+            RingSession(
+                group_id=1, initiated_by=1, target_device_id=1, status="completed",
+                started_at=now - timedelta(days=age)
+            )
+            for age in ages_in_days
+        ]
+        db.add_all(sessions)
+        db.commit()
+        return [session.id for session in sessions]
+    finally:
+        db.close()
+
+
+def remaining_ids():
+    db = SessionLocal()
+    try:
+        hot = db.scalars(select(RingSession.id).order_by(RingSession.id)).all()
+        archived = db.scalars(select(RingSessionArchive.id).order_by(RingSessionArchive.id)).all()
+        return hot, archived
+    finally:
+        db.close()
+
+
+def test_archive_moves_expired_sessions_in_batches():
+    ids = seed([40, 39, 38, 37, 36, 1, 0])
+
+    archiver = RingArchiver(retention_days=30, batch_size=2)
+    assert asyncio.run(archiver.archive()) == 5
+
+    assert remaining_ids() == (ids[5:], ids[:5])
+
+
+def test_archive_stops_at_the_first_session_that_has_not_expired():
+    # An out-of-order old session behind a recent one waits for a later pass
+    ids = seed([40, 1, 35, 0])
+
+    archiver = RingArchiver(retention_days=30, batch_size=10)
+    assert asyncio.run(archiver.archive()) == 1
+
+    assert remaining_ids() == (ids[1:], ids[:1])
+
+
+def test_archive_with_nothing_expired_moves_nothing():
+    ids = seed([2, 1, 0])
+
+    assert asyncio.run(RingArchiver(retention_days=30, batch_size=2).archive()) == 0
+    assert remaining_ids() == (ids, [])
@@ -0,0 +1,91 @@
+import asyncio
+
+from app.services.push_subscriptions import Subscription
+from app.services.ring_escalation import RingEscalator
+from app.websocket.backplane import InProcessBackplane, InProcessHub
+from app.websocket.manager import ConnectionManager, manager
+
+SUBSCRIPTION = Subscription(
+    id=1, device_pk=5, endpoint="https://push.example.com/abc", origin="https://push.example.com",
+    info={"endpoint": "https://push.example.com/abc", "keys": {"p256dh": "p", "auth": "a"}}
+)
+
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+
+async def attach_workers(escalator: RingEscalator):
+    """The global manager, holding escalator's pushes, and a worker holding the phone's socket."""
+    hub = InProcessHub()
+    socket_worker = ConnectionManager()
+    await socket_worker.attach_backplane(InProcessBackplane(hub))
+    await manager.attach_backplane(InProcessBackplane(hub))
+    manager.event_handlers["ring_acked"] = escalator.acknowledge_many
+    manager.event_handlers["ring_push_cancelled"] = escalator.cancel_many
+    await socket_worker.connect(FakeWebSocket(), "phone", user_id=1)
+    return socket_worker
+
+
+async def detach_workers():
+    manager.event_handlers.pop("ring_acked", None)
+    manager.event_handlers.pop("ring_push_cancelled", None)
+    await manager.detach_backplane()
+
+
+def test_push_for_a_device_on_another_worker_waits_for_its_ack():
+    async def scenario():
+        escalator = RingEscalator(ack_deadline=30)
+        socket_worker = await attach_workers(escalator)
+        try:
+            assert escalator.deliver(42, "phone", "Phone", SUBSCRIPTION, {}) == "awaiting_ack"
+
+            # The ack reaches the worker holding the socket, which has no push for it
+            await socket_worker.publish_event("ring_acked", [[42, "phone"]])
+
+            assert escalator.get_stats()["avoided"] == 1
+            assert escalator.get_stats()["pending"] == 0
+        finally:
+            await detach_workers()
+
+    asyncio.run(scenario())
+
+
+def test_acks_and_cancellations_for_rings_not_held_here_are_published():
+    async def scenario():
+        escalator = RingEscalator(ack_deadline=30)
+        socket_worker = await attach_workers(escalator)
+        published = []
+        socket_worker.event_handlers["ring_acked"] = published.append
+        socket_worker.event_handlers["ring_push_cancelled"] = published.append
+        try:
+            await escalator.acknowledge("42", "phone")
+            await escalator.cancel(43)
+            await escalator.acknowledge("not a ring", "phone")
+
+            assert published == [[[42, "phone"]], [43]]
+        finally:
+            await detach_workers()
+
+    asyncio.run(scenario())
+
+
+def test_device_connected_nowhere_is_pushed_straight_away():
+    async def scenario():
+        escalator = RingEscalator(ack_deadline=30)
+        await attach_workers(escalator)
+        try:
+            escalator.deliver(42, "laptop", "Laptop", SUBSCRIPTION, {})
+            assert escalator.get_stats()["pushed_immediately"] == 1
+            assert escalator.get_stats()["pending"] == 0
+        finally:
+            await detach_workers()
+
+    asyncio.run(scenario())
@@ -134,6 +134,12 @@ class BuzzerApp {
             console.log("Device status changed:", data);
             this.updateDeviceStatus(data.device_id, data.online);
         });
+
+        // Several status updates coalesced by the server into one frame
+        wsClient.on("device_status_batch", (data) => {
+            console.log("Device status batch:", data);
+            data.statuses.forEach(s => this.updateDeviceStatus(s.device_id, s.online));
+        });
     }
 
     async loadGroups() {
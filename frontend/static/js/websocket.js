@@ -34,10 +34,16 @@ class WebSocketClient {
             }
         };
 
-        this.ws.onclose = () => {
+        this.ws.onclose = (event) => {
             console.log("WebSocket disconnected");
             this.stopHeartbeat();
             this.onConnectionChange(false);
+
+            // 4000: this device connected again elsewhere (e.g. another tab)
+            if (event.code === 4000) {
+                console.log("Connection superseded, not reconnecting");
+                return;
+            }
             this.attemptReconnect();
         };
 